@@ -1,49 +1,73 @@
-import sys, os, sqlite3, calendar, datetime
+import sys, os, sqlite3, calendar, datetime, time, threading, queue, difflib
+from time import perf_counter
 from PyQt5 import (QtWidgets, QtGui, QtCore)
 
-DB = 'eduquest_gui.db'
-NOTES_DIR = 'eduquest_notes'
+from eduquest.perf import PERF
+from eduquest.db import to_day, from_day, from_minute
+from eduquest.schema import init_db
+from eduquest.users import authenticate, create_user, password_change_required, change_password
+from eduquest.events import AGENDA_PAGE_SIZE, EventCache, month_grid, add_event, delete_event, search_events, day_activity, week_activity
+from eduquest.flashcards import is_flashcard, split_flashcard, add_flashcard
+from eduquest.notes import (read_note_title, list_notes, save_note, delete_note, list_note_revisions, load_note_revision,
+                            record_note_revision, delete_note_revisions)
+from eduquest.sessions import (SESSION_MIN_SECONDS, list_sessions, total_study_seconds, format_seconds,
+                               open_session_segment, close_session_segment, checkpoint_session_segments)
+from eduquest.ics import import_ics, export_ics
+from eduquest.sync import export_sync_bundle, import_sync_bundle
+from eduquest.maintenance import due_maintenance, run_maintenance, list_backups
+
 PRIMARY_COLOR = '#4a148c'
 ACCENT_COLOR = '#7b45ff'
 BACKGROUND_DARK = '#2d2d3c'
 BACKGROUND_LIGHT = '#ffffff'
 CARD_BACKGROUND = '#3a3a4c'
+PREFETCH_MONTHS = 1
+NOTE_CHUNK_CHARS = 64 * 1024
+NOTE_CHUNKS_IN_FLIGHT = 2
+SESSION_IDLE_SECONDS = 120
+SESSION_CHECKPOINT_MS = 30000
+MAINTENANCE_POLL_MS = 60000
+
+
+class WidgetAllocationCounter(QtCore.QObject):
+    def __init__(self, recorder):
+        super().__init__()
+        self.recorder = recorder
+        recorder.listeners.append(self.set_active)
+
+    def set_active(self, enabled):
+        app = QtWidgets.QApplication.instance()
+        if app is None:
+            return
+        if enabled:
+            app.installEventFilter(self)
+        else:
+            app.removeEventFilter(self)
+
+    def eventFilter(self, source, event):
+        if event.type() == QtCore.QEvent.ChildAdded:
+            child = event.child()
+            if child.isWidgetType():
+                self.recorder.count(f"widget:{child.metaObject().className()}")
+        return False
+
+
+class FirstPaintProbe(QtCore.QObject):
+    def __init__(self, widget, name, started):
+        super().__init__(widget)
+        self.name = name
+        self.started = started
+        widget.installEventFilter(self)
+
+    def eventFilter(self, source, event):
+        if event.type() == QtCore.QEvent.Paint:
+            PERF.record(f"first_paint:{self.name}", perf_counter() - self.started)
+            source.removeEventFilter(self)
+        return False
+
+
+WIDGET_COUNTER = WidgetAllocationCounter(PERF)
 
-def init_db():
-    conn = sqlite3.connect(DB)
-    c = conn.cursor()
-    
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            title TEXT NOT NULL, 
-            date TEXT NOT NULL, 
-            time TEXT 
-        )
-    """)
-    
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS study_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, 
-            type TEXT NOT NULL, 
-            start_time TEXT NOT NULL, 
-            end_time TEXT NOT NULL,
-            duration_seconds INTEGER NOT NULL
-        )
-    """)
-    
-    conn.commit()
-
-    try:
-        c.execute("SELECT time FROM events LIMIT 1")
-    except sqlite3.OperationalError:
-        print("MIGRATING DATABASE: Adding 'time' column to events table.")
-        c.execute("ALTER TABLE events ADD COLUMN time TEXT")
-        conn.commit()
-    
-    conn.close()
-    if not os.path.exists(NOTES_DIR):
-        os.makedirs(NOTES_DIR)
 
 GLOBAL_STYLE = f"""
     QMainWindow {{
@@ -150,11 +174,405 @@ class RoundLogo(QtWidgets.QLabel):
             pixmap.setMask(mask.mask())
             self.setPixmap(pixmap)
 
+def blend_color(low, high, amount):
+    low, high = QtGui.QColor(low), QtGui.QColor(high)
+    return QtGui.QColor(*(int(a + (b - a) * amount) for a, b in zip(low.getRgb()[:3], high.getRgb()[:3])))
+
+def week_start_of(day):
+    return day - datetime.timedelta(days=(day.weekday() + 1) % 7)
+
+class YearHeatmap(QtWidgets.QWidget):
+    day_activated = QtCore.pyqtSignal(str)
+    LEVELS = [blend_color(CARD_BACKGROUND, ACCENT_COLOR, amount) for amount in (0, 0.35, 0.6, 0.8, 1)]
+    STUDY_COLOR = QtGui.QColor("#ffd54f")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.year = datetime.date.today().year
+        self.activity = {}
+        self.max_events = self.max_seconds = 0
+        self.setMouseTracking(True)
+        self.setMinimumHeight(200)
+
+    def set_year(self, year, activity):
+        self.year = year
+        self.activity = activity
+        self.max_events = max((events for events, _ in activity.values()), default=0)
+        self.max_seconds = max((seconds for _, seconds in activity.values()), default=0)
+        self.update()
+
+    def geometry_for_year(self):
+        first = datetime.date(self.year, 1, 1)
+        offset = (first.weekday() + 1) % 7
+        cell = max(6.0, min((self.width() - 50) / 53, (self.height() - 70) / 7))
+        return first, offset, cell
+
+    def day_rect(self, first, offset, cell, day):
+        index = offset + (day - first).days
+        return QtCore.QRectF(40 + (index // 7) * cell, 28 + (index % 7) * cell, cell - 3, cell - 3)
+
+    def day_at(self, pos):
+        first, offset, cell = self.geometry_for_year()
+        col, row = int((pos.x() - 40) // cell), int((pos.y() - 28) // cell)
+        if pos.x() < 40 or pos.y() < 28 or not 0 <= row < 7:
+            return None
+        day = first + datetime.timedelta(days=col * 7 + row - offset)
+        return day if day.year == self.year and self.day_rect(first, offset, cell, day).contains(pos) else None
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QtGui.QColor(BACKGROUND_DARK))
+        first, offset, cell = self.geometry_for_year()
+        today = datetime.date.today()
+        painter.setPen(QtGui.QColor("#b0b0c0"))
+        painter.setFont(QtGui.QFont(self.font().family(), 9))
+        for month in range(1, 13):
+            rect = self.day_rect(first, offset, cell, datetime.date(self.year, month, 1))
+            painter.drawText(QtCore.QPointF(rect.left(), 20), calendar.month_abbr[month])
+        for row, name in ((1, "Mon"), (3, "Wed"), (5, "Fri")):
+            painter.drawText(QtCore.QRectF(0, 28 + row * cell, 36, cell - 3), QtCore.Qt.AlignVCenter | QtCore.Qt.AlignRight, name)
+
+        painter.setPen(QtCore.Qt.NoPen)
+        base = to_day(first)
+        for offset_days in range((datetime.date(self.year + 1, 1, 1) - first).days):
+            day = first + datetime.timedelta(days=offset_days)
+            events, seconds = self.activity.get(base + offset_days, (0, 0))
+            rect = self.day_rect(first, offset, cell, day)
+            level = 0 if not events else 1 + min(3, (4 * events - 1) // self.max_events)
+            painter.setBrush(self.LEVELS[level])
+            painter.drawRoundedRect(rect, 2, 2)
+            if seconds:
+                radius = (cell - 3) * (0.12 + 0.2 * seconds / self.max_seconds)
+                painter.setBrush(self.STUDY_COLOR)
+                painter.drawEllipse(rect.center(), radius, radius)
+            if day == today:
+                painter.setPen(QtGui.QPen(QtCore.Qt.white, 1.5))
+                painter.setBrush(QtCore.Qt.NoBrush)
+                painter.drawRoundedRect(rect, 2, 2)
+                painter.setPen(QtCore.Qt.NoPen)
+
+        legend_y = 28 + 7 * cell + 14
+        painter.setPen(QtGui.QColor("#b0b0c0"))
+        painter.drawText(QtCore.QPointF(40, legend_y + 10), "Fewer events")
+        for i, color in enumerate(self.LEVELS):
+            painter.fillRect(QtCore.QRectF(130 + i * 16, legend_y, 12, 12), color)
+        painter.drawText(QtCore.QPointF(216, legend_y + 10), "More")
+        painter.setBrush(self.STUDY_COLOR)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.drawEllipse(QtCore.QPointF(276, legend_y + 6), 4, 4)
+        painter.setPen(QtGui.QColor("#b0b0c0"))
+        painter.drawText(QtCore.QPointF(286, legend_y + 10), "Study time")
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        day = self.day_at(event.pos())
+        if day is None:
+            QtWidgets.QToolTip.hideText()
+            return
+        events, seconds = self.activity.get(to_day(day), (0, 0))
+        QtWidgets.QToolTip.showText(event.globalPos(), f"{day.strftime('%a %d %b %Y')}\n{events} events · {format_seconds(seconds)} studied", self)
+
+    def mouseDoubleClickEvent(self, event):
+        day = self.day_at(event.pos())
+        if day is not None:
+            self.day_activated.emit(day.isoformat())
+
+class WeekTimeline(QtWidgets.QWidget):
+    day_activated = QtCore.pyqtSignal(str)
+    HEADER = 44
+    ALL_DAY = 24
+    GUTTER = 48
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.start = week_start_of(datetime.date.today())
+        self.slots = {}
+        self.study = {}
+        self.blocks = []
+        self.setMouseTracking(True)
+        self.setMinimumHeight(300)
+
+    def set_week(self, start, slots, study):
+        self.start = start
+        self.slots = slots
+        self.study = study
+        self.update()
+
+    def column_width(self):
+        return (self.width() - self.GUTTER) / 7
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QtGui.QColor(BACKGROUND_DARK))
+        col_w = self.column_width()
+        top = self.HEADER + self.ALL_DAY
+        hour_h = (self.height() - top - 4) / 24
+        grid_pen = QtGui.QPen(QtGui.QColor(CARD_BACKGROUND))
+        muted = QtGui.QColor("#b0b0c0")
+        small = QtGui.QFont(self.font().family(), 9)
+        bold = QtGui.QFont(self.font().family(), 10, QtGui.QFont.Bold)
+        today = datetime.date.today()
+        base = to_day(self.start)
+
+        painter.setFont(small)
+        for hour in range(0, 24, 2):
+            y = top + hour * hour_h
+            painter.setPen(grid_pen)
+            painter.drawLine(QtCore.QPointF(self.GUTTER, y), QtCore.QPointF(self.width(), y))
+            painter.setPen(muted)
+            painter.drawText(QtCore.QRectF(0, y - 8, self.GUTTER - 6, 16), QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter, f"{hour:02d}:00")
+
+        self.blocks = []
+        for col in range(7):
+            day = self.start + datetime.timedelta(days=col)
+            x = self.GUTTER + col * col_w
+            painter.setPen(grid_pen)
+            painter.drawLine(QtCore.QPointF(x, 0), QtCore.QPointF(x, self.height()))
+            header = QtCore.QRectF(x + 4, 4, col_w - 8, self.HEADER - 8)
+            if day == today:
+                painter.setPen(QtCore.Qt.NoPen)
+                painter.setBrush(QtGui.QColor(ACCENT_COLOR))
+                painter.drawRoundedRect(header, 6, 6)
+            painter.setPen(QtCore.Qt.white)
+            painter.setFont(bold)
+            painter.drawText(header.adjusted(4, 0, 0, 0), QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop, day.strftime("%a %d"))
+            seconds = self.study.get(base + col)
+            if seconds:
+                painter.setFont(small)
+                painter.setPen(QtGui.QColor("#ffd54f"))
+                painter.drawText(header.adjusted(4, 0, 0, 0), QtCore.Qt.AlignLeft | QtCore.Qt.AlignBottom, f"{format_seconds(seconds)} studied")
+
+            painter.setFont(small)
+            slots = sorted(self.slots.get(base + col, []), key=lambda s: -1 if s[0] is None else s[0])
+            for i, (minute, count, titles) in enumerate(slots):
+                if minute is None:
+                    rect = QtCore.QRectF(x + 3, self.HEADER, col_w - 6, self.ALL_DAY - 4)
+                    text = titles[0] if count == 1 else f"{count} all-day"
+                else:
+                    gap = (slots[i + 1][0] - minute) / 60 * hour_h if i + 1 < len(slots) else hour_h
+                    rect = QtCore.QRectF(x + 3, top + minute / 60 * hour_h, col_w - 6, max(min(hour_h, gap) - 1, 12))
+                    text = f"{from_minute(minute)} {titles[0]}" + (f" +{count - 1}" if count > 1 else "")
+                painter.setPen(QtCore.Qt.NoPen)
+                painter.setBrush(QtGui.QColor(ACCENT_COLOR if minute is not None else PRIMARY_COLOR))
+                painter.drawRoundedRect(rect, 4, 4)
+                if rect.height() >= painter.fontMetrics().height():
+                    painter.setPen(QtCore.Qt.white)
+                    painter.drawText(rect.adjusted(4, 0, -2, 0), QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter,
+                                     painter.fontMetrics().elidedText(text, QtCore.Qt.ElideRight, int(rect.width() - 6)))
+                self.blocks.append((rect, "\n".join(titles)))
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        for rect, tooltip in self.blocks:
+            if rect.contains(QtCore.QPointF(event.pos())):
+                QtWidgets.QToolTip.showText(event.globalPos(), tooltip, self)
+                return
+        QtWidgets.QToolTip.hideText()
+
+    def mouseDoubleClickEvent(self, event):
+        col = int((event.pos().x() - self.GUTTER) // self.column_width())
+        if event.pos().x() >= self.GUTTER and 0 <= col < 7:
+            self.day_activated.emit((self.start + datetime.timedelta(days=col)).isoformat())
+
+class TrackedSession:
+    def __init__(self, user_id, kind):
+        self.user_id = user_id
+        self.kind = kind
+        self.row_id = None
+        self.segment_start = None
+        self.total_seconds = 0
+
+
+class SessionTracker(QtCore.QObject):
+    ACTIVITY_EVENTS = frozenset((QtCore.QEvent.KeyPress, QtCore.QEvent.MouseButtonPress, QtCore.QEvent.MouseMove,
+                                 QtCore.QEvent.Wheel, QtCore.QEvent.TouchBegin, QtCore.QEvent.WindowActivate))
+
+    def __init__(self, parent=None, idle_seconds=SESSION_IDLE_SECONDS, checkpoint_ms=SESSION_CHECKPOINT_MS):
+        super().__init__(parent)
+        self.idle_seconds = idle_seconds
+        self.sessions = []
+        self.paused = False
+        self.filtering = False
+        self.last_activity = time.time()
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(checkpoint_ms)
+        self.timer.timeout.connect(self.checkpoint)
+
+    def begin(self, user_id, kind):
+        session = TrackedSession(user_id, kind)
+        self.last_activity = time.time()
+        if self.paused:
+            self.resume()
+        self.sessions.append(session)
+        self.open_segment(session, self.last_activity)
+        if not self.filtering:
+            QtWidgets.QApplication.instance().installEventFilter(self)
+            self.filtering = True
+            self.timer.start()
+        return session
+
+    def end(self, session):
+        if session not in self.sessions:
+            return 0
+        self.sessions.remove(session)
+        if session.row_id is not None:
+            now = time.time()
+            self.close_segment(session, now if now - self.last_activity <= self.idle_seconds else self.last_activity)
+        if not self.sessions:
+            QtWidgets.QApplication.instance().removeEventFilter(self)
+            self.filtering = False
+            self.paused = False
+            self.timer.stop()
+        return session.total_seconds
+
+    def eventFilter(self, source, event):
+        etype = event.type()
+        if etype in self.ACTIVITY_EVENTS:
+            self.last_activity = time.time()
+            if self.paused:
+                self.resume()
+        elif etype == QtCore.QEvent.ApplicationStateChange and not self.paused:
+            if QtWidgets.QApplication.instance().applicationState() != QtCore.Qt.ApplicationActive:
+                self.pause(time.time())
+        return False
+
+    def checkpoint(self):
+        if self.paused:
+            return
+        now = time.time()
+        if now - self.last_activity > self.idle_seconds:
+            self.pause(self.last_activity)
+            return
+        checkpoint_session_segments([(s.row_id, s.segment_start) for s in self.sessions], now)
+
+    def pause(self, at):
+        for s in self.sessions:
+            self.close_segment(s, at)
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        for s in self.sessions:
+            self.open_segment(s, self.last_activity)
+
+    def open_segment(self, session, at):
+        session.row_id = open_session_segment(session.user_id, session.kind, at)
+        session.segment_start = at
+
+    def close_segment(self, session, at):
+        session.total_seconds += close_session_segment(session.row_id, session.segment_start, at)
+        session.row_id = None
+        session.segment_start = None
+
+
+class IcsImportWorker(QtCore.QThread):
+    progress = QtCore.pyqtSignal(int, int, int)
+    done = QtCore.pyqtSignal(int, int, int)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, path, user_id, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.user_id = user_id
+
+    def run(self):
+        try:
+            processed, inserted, skipped = import_ics(self.path, self.user_id, progress=self.report)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.done.emit(processed, inserted, skipped)
+
+    def report(self, processed, inserted, fraction):
+        self.progress.emit(processed, inserted, int(fraction * 100))
+
+
+class MaintenanceWorker(QtCore.QThread):
+    done = QtCore.pyqtSignal(dict)
+
+    def __init__(self, tasks, parent=None):
+        super().__init__(parent)
+        self.tasks = tasks
+        self.stopping = False
+
+    def run(self):
+        self.done.emit(run_maintenance(self.tasks, stop=lambda: self.stopping))
+
+    def stop(self):
+        self.stopping = True
+
+
+class MaintenanceScheduler(QtCore.QObject):
+    finished = QtCore.pyqtSignal(dict)
+
+    def __init__(self, tracker, parent=None, poll_ms=MAINTENANCE_POLL_MS):
+        super().__init__(parent)
+        self.tracker = tracker
+        self.worker = None
+        self.last_cursor = None
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(poll_ms)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start()
+
+    def is_idle(self):
+        app = QtWidgets.QApplication.instance()
+        if self.tracker.sessions and not self.tracker.paused:
+            return False
+        if app.activeModalWidget() is not None:
+            return False
+        cursor = QtGui.QCursor.pos()
+        still = cursor == self.last_cursor
+        self.last_cursor = cursor
+        return still or app.applicationState() != QtCore.Qt.ApplicationActive
+
+    def poll(self):
+        if self.worker is not None and self.worker.isRunning():
+            return
+        if self.is_idle():
+            tasks = due_maintenance()
+            if tasks:
+                self.run(tasks)
+
+    def run(self, tasks):
+        self.worker = MaintenanceWorker(tasks, self)
+        self.worker.done.connect(self.finished)
+        self.worker.start()
+
+    def stop(self):
+        self.timer.stop()
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker.wait()
+
+
+class EventPrefetcher(QtCore.QThread):
+    fetched = QtCore.pyqtSignal(object, object, int)
+
+    def __init__(self, cache, dates, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.dates = dates
+        self.version = cache.version
+
+    def run(self):
+        try:
+            with PERF.span("prefetch:events"):
+                rows = self.cache.fetch(self.dates)
+        except sqlite3.Error as e:
+            print(f"Event prefetch failed: {e}")
+            return
+        self.fetched.emit(self.cache, rows, self.version)
+
+
 class EventDialog(QtWidgets.QDialog):
     def __init__(self, parent, date):
         super().__init__(parent)
         self.setWindowTitle(f"Add/View Events — {date}")
         self.date = date
+        self.user_id = parent.user_id
         self.resize(450,400)
         
         v = QtWidgets.QVBoxLayout()
@@ -195,46 +613,33 @@ class EventDialog(QtWidgets.QDialog):
 
     def load_events(self):
         self.listw.clear()
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
-        c.execute("SELECT id, title, time FROM events WHERE date=? ORDER BY time, id", (self.date,))
-        for row in c.fetchall():
-            event_id = row[0]
-            title = row[1]
-            time = row[2] if row[2] else "N/A"
-            display_text = f"[{time}] {title}"
+        for row in self.parent().event_cache.get_day(self.date):
+            time = row.time if row.time else "N/A"
+            display_text = f"[{time}] {row.title}"
             item = QtWidgets.QListWidgetItem(display_text)
-            item.setData(QtCore.Qt.UserRole, event_id)
+            item.setData(QtCore.Qt.UserRole, row.id)
             self.listw.addItem(item)
-        conn.close()
 
     def add_event(self):
         title = self.title_in.text().strip()
         time = self.time_in.time().toString("HH:mm")
         if not title:
             return
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
-        c.execute("INSERT INTO events (title, date, time) VALUES (?,?,?)", (title, self.date, time))
-        conn.commit()
-        conn.close()
+        add_event(self.user_id, self.date, title, time)
+        self.parent().event_cache.invalidate(self.date)
         self.title_in.clear()
         self.load_events()
-        self.parent().populate_calendar(self.parent().current_date.year, self.parent().current_date.month)
+        self.parent().refresh_view()
 
 
     def delete_selected(self):
         item = self.listw.currentItem()
         if not item:
             return
-        ev_id = item.data(QtCore.Qt.UserRole)
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
-        c.execute("DELETE FROM events WHERE id=?", (ev_id,))
-        conn.commit()
-        conn.close()
+        delete_event(self.user_id, item.data(QtCore.Qt.UserRole))
+        self.parent().event_cache.invalidate(self.date)
         self.load_events()
-        self.parent().populate_calendar(self.parent().current_date.year, self.parent().current_date.month)
+        self.parent().refresh_view()
 
 
 class StudyHistoryDialog(QtWidgets.QDialog):
@@ -242,6 +647,7 @@ class StudyHistoryDialog(QtWidgets.QDialog):
         super().__init__(parent)
         self.setWindowTitle("Study History 📚")
         self.resize(550, 450)
+        self.user_id = parent.user_id
         self.setStyleSheet(f"QDialog {{ background-color: {BACKGROUND_LIGHT}; }}")
         
         v = QtWidgets.QVBoxLayout()
@@ -258,43 +664,157 @@ class StudyHistoryDialog(QtWidgets.QDialog):
 
     def load_history(self):
         self.listw.clear()
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
-        
-        c.execute("SELECT SUM(duration_seconds) FROM study_sessions")
-        total_seconds = c.fetchone()[0] or 0
-        total_duration = self.format_seconds(total_seconds)
+        total_duration = format_seconds(total_study_seconds(self.user_id))
         self.total_lbl.setText(f"Total Study Time: **{total_duration}**")
         
-        c.execute("SELECT type, start_time, duration_seconds FROM study_sessions ORDER BY start_time DESC")
-        
-        for type, start_time, duration_seconds in c.fetchall():
-            duration_str = self.format_seconds(duration_seconds)
-            
-            try:
-                dt = datetime.datetime.fromisoformat(start_time)
-                start_str = dt.strftime("%Y-%m-%d @ %I:%M %p")
-            except ValueError:
-                start_str = start_time
-                
-            item_text = f"[{type}] {start_str} | Duration: {duration_str}"
+        for row in list_sessions(self.user_id):
+            duration_str = format_seconds(row.duration_seconds)
+            start_str = row.start.strftime("%Y-%m-%d @ %I:%M %p")
+            item_text = f"[{row.type}] {start_str} | Duration: {duration_str}"
             self.listw.addItem(item_text)
-            
-        conn.close()
 
-    def format_seconds(self, total_seconds):
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
+
+class NoteHistoryDialog(QtWidgets.QDialog):
+    def __init__(self, parent, user_id, note):
+        super().__init__(parent)
+        self.setWindowTitle("Note History")
+        self.resize(800, 500)
+        self.setStyleSheet(f"QDialog {{ background-color: {BACKGROUND_LIGHT}; }}")
+        self.user_id = user_id
+        self.note = note
+        self.restored_text = None
+        
+        h = QtWidgets.QHBoxLayout()
         
-        parts = []
-        if hours > 0:
-            parts.append(f"{hours}h")
-        if minutes > 0:
-            parts.append(f"{minutes}m")
-        parts.append(f"{seconds}s")
+        self.listw = QtWidgets.QListWidget()
+        self.listw.setFixedWidth(240)
+        self.listw.currentItemChanged.connect(self.show_diff)
+        h.addWidget(self.listw)
         
-        return " ".join(parts)
+        v = QtWidgets.QVBoxLayout()
+        self.diff_view = QtWidgets.QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.diff_view.setStyleSheet("QPlainTextEdit { font-family: 'Consolas', 'Courier New', monospace; font-size: 12px; }")
+        v.addWidget(self.diff_view)
+        
+        restore = QtWidgets.QPushButton("Restore This Version")
+        restore.clicked.connect(self.restore)
+        v.addWidget(restore)
+        h.addLayout(v)
+        self.setLayout(h)
+        
+        for rev, created_ts, size, kind in list_note_revisions(user_id, note):
+            stamp = datetime.datetime.fromtimestamp(created_ts).strftime("%Y-%m-%d %H:%M")
+            item = QtWidgets.QListWidgetItem(f"Rev {rev} — {stamp} ({size} chars)")
+            item.setData(QtCore.Qt.UserRole, rev)
+            self.listw.addItem(item)
+        if self.listw.count():
+            self.listw.setCurrentRow(0)
+        else:
+            self.diff_view.setPlainText("No saved versions yet.")
+
+    def show_diff(self, item, previous=None):
+        if item is None:
+            return
+        rev = item.data(QtCore.Qt.UserRole)
+        new = load_note_revision(self.user_id, self.note, rev) or ""
+        older = self.listw.item(self.listw.row(item) + 1)
+        old = load_note_revision(self.user_id, self.note, older.data(QtCore.Qt.UserRole)) if older else ""
+        diff = difflib.unified_diff(old.splitlines(), new.splitlines(), "previous", f"rev {rev}", lineterm="")
+        self.diff_view.setPlainText("\n".join(diff) or "No changes.")
+
+    def restore(self):
+        item = self.listw.currentItem()
+        if item is None:
+            return
+        self.restored_text = load_note_revision(self.user_id, self.note, item.data(QtCore.Qt.UserRole))
+        self.accept()
+
+
+class NoteLoader(QtCore.QThread):
+    chunk = QtCore.pyqtSignal(str)
+    done = QtCore.pyqtSignal()
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, fpath, parent=None):
+        super().__init__(parent)
+        self.fpath = fpath
+        self.credits = threading.Semaphore(NOTE_CHUNKS_IN_FLIGHT)
+        self.stopped = False
+
+    def run(self):
+        try:
+            with open(self.fpath, "r", encoding="utf-8") as f:
+                f.readline()
+                leading = True
+                while True:
+                    self.credits.acquire()
+                    if self.stopped:
+                        return
+                    text = f.read(NOTE_CHUNK_CHARS)
+                    if not text:
+                        break
+                    if leading:
+                        text = text.lstrip()
+                        if not text:
+                            self.credits.release()
+                            continue
+                        leading = False
+                    self.chunk.emit(text)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.done.emit()
+
+    def consumed(self):
+        self.credits.release()
+
+    def stop(self):
+        self.stopped = True
+        self.credits.release()
+        self.wait()
+
+
+class NoteRevisionRecorder(QtCore.QThread):
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = queue.Queue()
+
+    def record(self, user_id, note, text):
+        self.submit(record_note_revision, user_id, note, text)
+
+    def forget(self, user_id, note):
+        self.submit(delete_note_revisions, user_id, note)
+
+    def submit(self, fn, *args):
+        self.jobs.put((fn, args))
+        if not self.isRunning():
+            self.start()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                fn, args = job
+                fn(*args)
+            except (sqlite3.Error, ValueError) as e:
+                self.failed.emit(str(e))
+            finally:
+                self.jobs.task_done()
+
+    def flush(self):
+        if self.isRunning():
+            self.jobs.join()
+
+    def stop(self):
+        if self.isRunning():
+            self.jobs.put(None)
+            self.wait()
 
 
 class NotesDialog(QtWidgets.QDialog):
@@ -302,9 +822,11 @@ class NotesDialog(QtWidgets.QDialog):
         super().__init__(parent)
         self.setWindowTitle("Notes — Persistent Editor")
         self.resize(800, 600)
+        self.user_id = parent.user_id
         self.setStyleSheet(f"QDialog {{ background-color: {BACKGROUND_LIGHT}; }}")
         
-        self.start_time = datetime.datetime.now() 
+        self.session = parent.session_tracker.begin(self.user_id, "Notes")
+        self.finished.connect(self.end_session)
         
         h = QtWidgets.QHBoxLayout()
         
@@ -341,14 +863,20 @@ class NotesDialog(QtWidgets.QDialog):
         save = QtWidgets.QPushButton("Save")
         save.setStyleSheet(f"QPushButton {{ background-color: {ACCENT_COLOR}; border: none; }}")
         save.clicked.connect(self.save_note)
+        self.save_btn = save
         
         delete = QtWidgets.QPushButton("Delete")
         delete.setStyleSheet(f"QPushButton {{ background-color: #f0ad4e; border: none; }} QPushButton:hover {{ background-color: #ec971f; }}")
         delete.clicked.connect(self.delete_note)
         
+        history = QtWidgets.QPushButton("History")
+        history.setStyleSheet("QPushButton { background: none; color: #555; border: 1px solid #ccc; } QPushButton:hover { color: #333; background-color: #eee; }")
+        history.clicked.connect(self.show_history)
+        
         btn_h.addWidget(new)
         btn_h.addWidget(save)
         btn_h.addWidget(delete)
+        btn_h.addWidget(history)
         
         v.addWidget(self.title)
         v.addWidget(self.body)
@@ -358,22 +886,13 @@ class NotesDialog(QtWidgets.QDialog):
         self.setLayout(h)
         
         self.all_notes = {}
+        self.loader = None
         self.load_note_list()
         self.new_note()
 
     def load_note_list(self):
         self.listw.clear()
-        self.all_notes = {}
-        for fname in os.listdir(NOTES_DIR):
-            if fname.endswith(".txt"):
-                fpath = os.path.join(NOTES_DIR, fname)
-                try:
-                    with open(fpath, "r", encoding="utf-8") as f:
-                        lines = f.readlines()
-                        title = lines[0].strip() if lines else fname
-                        self.all_notes[title] = fpath
-                except Exception as e:
-                    print(f"Error loading note {fname}: {e}")
+        self.all_notes = list_notes(self.user_id)
         self.filter_notes("") 
 
     def filter_notes(self, text):
@@ -384,6 +903,7 @@ class NotesDialog(QtWidgets.QDialog):
                 self.listw.addItem(title)
 
     def new_note(self):
+        self.stop_loader()
         self.current_fname = None
         self.title.clear()
         self.body.clear()
@@ -393,17 +913,57 @@ class NotesDialog(QtWidgets.QDialog):
         title = item.text()
         fpath = self.all_notes.get(title)
         if fpath and os.path.exists(fpath):
+            self.stop_loader()
             try:
-                with open(fpath, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    parts = content.split('\n\n', 1)
-                    self.title.setText(parts[0].strip())
-                    self.body.setPlainText(parts[1].strip() if len(parts) > 1 else "")
-                    self.current_fname = fpath
+                self.title.setText(read_note_title(fpath))
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, "Error", f"Could not load note: {e}")
+                return
+            self.current_fname = fpath
+            self.body.clear()
+            self.body.setUndoRedoEnabled(False)
+            self.body.setReadOnly(True)
+            self.save_btn.setEnabled(False)
+            self.loader = NoteLoader(fpath, self)
+            self.loader.chunk.connect(self.append_note_chunk)
+            self.loader.done.connect(self.finish_note_load)
+            self.loader.failed.connect(self.fail_note_load)
+            self.loader.start()
+
+    def append_note_chunk(self, text):
+        if self.loader is None or self.sender() is not self.loader:
+            return
+        cursor = QtGui.QTextCursor(self.body.document())
+        cursor.movePosition(QtGui.QTextCursor.End)
+        cursor.insertText(text)
+        self.loader.consumed()
+
+    def finish_note_load(self):
+        if self.loader is None or self.sender() is not self.loader:
+            return
+        self.loader = None
+        self.body.setReadOnly(False)
+        self.body.setUndoRedoEnabled(True)
+        self.save_btn.setEnabled(True)
+
+    def fail_note_load(self, message):
+        if self.loader is None or self.sender() is not self.loader:
+            return
+        self.stop_loader()
+        self.current_fname = None
+        QtWidgets.QMessageBox.critical(self, "Error", f"Could not load note: {message}")
+
+    def stop_loader(self):
+        if self.loader is not None:
+            self.loader.stop()
+            self.loader = None
+        self.body.setReadOnly(False)
+        self.body.setUndoRedoEnabled(True)
+        self.save_btn.setEnabled(True)
 
     def save_note(self):
+        if self.loader is not None:
+            return
         t = self.title.text().strip()
         b = self.body.toPlainText().strip()
         
@@ -411,15 +971,8 @@ class NotesDialog(QtWidgets.QDialog):
             QtWidgets.QMessageBox.warning(self, "Empty Note", "Title or body cannot be empty.")
             return
 
-        if self.current_fname and os.path.exists(self.current_fname):
-            fname_to_use = self.current_fname
-        else:
-            fname_to_use = os.path.join(NOTES_DIR, f"note_{int(datetime.datetime.now().timestamp())}.txt")
-            
         try:
-            with open(fname_to_use, "w", encoding="utf-8") as f:
-                f.write(t + "\n\n" + b)
-            self.current_fname = fname_to_use
+            self.current_fname = save_note(self.user_id, t, b, self.current_fname, record=self.parent().note_revisions.record)
             QtWidgets.QMessageBox.information(self, "Saved", f"Note saved.")
             self.load_note_list()
             items = self.listw.findItems(t, QtCore.Qt.MatchExactly)
@@ -439,32 +992,38 @@ class NotesDialog(QtWidgets.QDialog):
 
         if reply == QtWidgets.QMessageBox.Yes:
             try:
-                os.remove(self.current_fname)
+                delete_note(self.user_id, self.current_fname, forget=self.parent().note_revisions.forget)
                 self.new_note() 
                 self.load_note_list()
                 QtWidgets.QMessageBox.information(self, "Deleted", "Note successfully deleted.")
             except Exception as e:
                 QtWidgets.QMessageBox.critical(self, "Error", f"Could not delete note: {e}")
                 
+    def show_history(self):
+        if not self.current_fname or self.loader is not None:
+            QtWidgets.QMessageBox.warning(self, "Select Note", "Open a saved note to see its history.")
+            return
+        self.parent().note_revisions.flush()
+        dlg = NoteHistoryDialog(self, self.user_id, os.path.basename(self.current_fname))
+        if dlg.exec_() == QtWidgets.QDialog.Accepted and dlg.restored_text is not None:
+            parts = dlg.restored_text.split('\n\n', 1)
+            self.title.setText(parts[0].strip())
+            self.body.setPlainText(parts[1].strip() if len(parts) > 1 else "")
+
     def closeEvent(self, event):
-        end_time = datetime.datetime.now()
-        duration = end_time - self.start_time
-        duration_seconds = int(duration.total_seconds())
-        
-        if duration_seconds > 5: 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute("INSERT INTO study_sessions (type, start_time, end_time, duration_seconds) VALUES (?,?,?,?)", 
-                      ("Notes", self.start_time.isoformat(), end_time.isoformat(), duration_seconds))
-            conn.commit()
-            conn.close()
-            
+        self.stop_loader()
+        super().closeEvent(event)
+
+    def end_session(self):
+        self.stop_loader()
+        with PERF.span("session_end:Notes"):
+            duration_seconds = self.parent().session_tracker.end(self.session)
+        
+        if duration_seconds > SESSION_MIN_SECONDS: 
             minutes = duration_seconds // 60
             seconds = duration_seconds % 60
             msg = f"Study time recorded: {minutes} minutes and {seconds} seconds spent viewing notes."
             self.parent().status.showMessage(msg, 5000)
-            
-        super().closeEvent(event)
 
 
 class FlashcardViewerDialog(QtWidgets.QDialog):
@@ -472,12 +1031,14 @@ class FlashcardViewerDialog(QtWidgets.QDialog):
         super().__init__(parent)
         self.setWindowTitle("Flashcards Study Mode")
         self.resize(600, 450)
+        self.user_id = parent.user_id
         self.setStyleSheet(f"QDialog {{ background-color: {BACKGROUND_LIGHT}; }}")
         self.cards = []
         self.current_card_index = -1
         self.is_front = True
         
-        self.start_time = datetime.datetime.now() 
+        self.session = parent.session_tracker.begin(self.user_id, "Flashcards")
+        self.finished.connect(self.end_session)
         
         v = QtWidgets.QVBoxLayout()
         
@@ -539,15 +1100,10 @@ class FlashcardViewerDialog(QtWidgets.QDialog):
 
     def load_cards(self):
         self.cards = []
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
         today = datetime.date.today().isoformat()
-        c.execute("SELECT title FROM events WHERE date=? ORDER BY id", (today,))
-        for r in c.fetchall():
-            if ' — ' in r[0]:
-                front, back = r[0].split(' — ', 1)
-                self.cards.append((front, back))
-        conn.close()
+        for r in sorted(self.parent().event_cache.get_day(today)):
+            if is_flashcard(r.title):
+                self.cards.append(split_flashcard(r.title))
 
     def show_card(self, index):
         if not self.cards:
@@ -592,25 +1148,15 @@ class FlashcardViewerDialog(QtWidgets.QDialog):
             return True
         return super().eventFilter(source, event)
         
-    def closeEvent(self, event):
-        end_time = datetime.datetime.now()
-        duration = end_time - self.start_time
-        duration_seconds = int(duration.total_seconds())
-
-        if duration_seconds > 5: 
-            conn = sqlite3.connect(DB)
-            c = conn.cursor()
-            c.execute("INSERT INTO study_sessions (type, start_time, end_time, duration_seconds) VALUES (?,?,?,?)", 
-                      ("Flashcards", self.start_time.isoformat(), end_time.isoformat(), duration_seconds))
-            conn.commit()
-            conn.close()
-            
+    def end_session(self):
+        with PERF.span("session_end:Flashcards"):
+            duration_seconds = self.parent().session_tracker.end(self.session)
+
+        if duration_seconds > SESSION_MIN_SECONDS: 
             minutes = duration_seconds // 60
             seconds = duration_seconds % 60
             msg = f"Study time recorded: {minutes} minutes and {seconds} seconds spent studying flashcards."
             self.parent().status.showMessage(msg, 5000)
-            
-        super().closeEvent(event)
 
 
 class FlashcardsDialog(QtWidgets.QDialog):
@@ -618,6 +1164,7 @@ class FlashcardsDialog(QtWidgets.QDialog):
         super().__init__(parent)
         self.setWindowTitle("Add Flashcards (Today)")
         self.resize(520,360)
+        self.user_id = parent.user_id
         v = QtWidgets.QVBoxLayout()
         
         title_lbl = QtWidgets.QLabel("New Flashcard for Today")
@@ -646,24 +1193,18 @@ class FlashcardsDialog(QtWidgets.QDialog):
         b = self.back.text().strip()
         if not f or not b:
             return
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
-        c.execute("INSERT INTO events (title,date) VALUES (?,?)", (f + " — " + b, datetime.date.today().isoformat()))
-        conn.commit()
-        conn.close()
+        today = datetime.date.today()
+        add_flashcard(self.user_id, f, b, today)
+        self.parent().event_cache.invalidate(today.isoformat())
         self.front.clear()
         self.back.clear()
         self.load_cards()
 
     def load_cards(self):
         self.cards_list.clear()
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
         today = datetime.date.today().isoformat()
-        c.execute("SELECT id,title FROM events WHERE date=? ORDER BY id", (today,))
-        for r in c.fetchall():
-            self.cards_list.addItem(r[1])
-        conn.close()
+        for r in sorted(self.parent().event_cache.get_day(today)):
+            self.cards_list.addItem(r.title)
 
 
 class NotificationsDialog(QtWidgets.QDialog):
@@ -671,6 +1212,7 @@ class NotificationsDialog(QtWidgets.QDialog):
         super().__init__(parent)
         self.setWindowTitle("Notifications — Upcoming Deadlines")
         self.resize(450,350)
+        self.user_id = parent.user_id
         v = QtWidgets.QVBoxLayout()
         
         title_lbl = QtWidgets.QLabel("Events Today & Tomorrow")
@@ -684,25 +1226,141 @@ class NotificationsDialog(QtWidgets.QDialog):
 
     def load_notifications(self):
         self.listw.clear()
-        conn = sqlite3.connect(DB)
-        c = conn.cursor()
         today = datetime.date.today()
         tomorrow = today + datetime.timedelta(days=1)
+        days = self.parent().event_cache.get_days([today.isoformat(), tomorrow.isoformat()])
         
-        c.execute("SELECT title, date, time FROM events WHERE date BETWEEN ? AND ? AND title NOT LIKE '% — %' ORDER BY date, time", (today.isoformat(), tomorrow.isoformat()))
-        
-        for r in c.fetchall():
-            title = r[0]
-            date_str = "Today" if r[1] == today.isoformat() else "Tomorrow"
-            time_str = r[2] if r[2] else "N/A"
-            self.listw.addItem(f"[{date_str} @ {time_str}] {title}")
-        
-        conn.close()
+        for date, rows in days.items():
+            date_str = "Today" if date == today.isoformat() else "Tomorrow"
+            for row in rows:
+                if is_flashcard(row.title):
+                    continue
+                time_str = row.time if row.time else "N/A"
+                self.listw.addItem(f"[{date_str} @ {time_str}] {row.title}")
         
         if self.listw.count() == 0:
             self.listw.addItem("No upcoming events found for today or tomorrow.")
 
 
+class AgendaDialog(QtWidgets.QDialog):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowTitle("Agenda — Search Events")
+        self.resize(560, 520)
+        self.user_id = parent.user_id
+        self.selected_date = None
+        self.last_row = None
+        self.exhausted = False
+        
+        v = QtWidgets.QVBoxLayout()
+        
+        self.search_input = QtWidgets.QLineEdit()
+        self.search_input.setPlaceholderText("🔎 Search events by title...")
+        v.addWidget(self.search_input)
+        
+        range_h = QtWidgets.QHBoxLayout()
+        today = QtCore.QDate.currentDate()
+        self.from_in = QtWidgets.QDateEdit(today)
+        self.to_in = QtWidgets.QDateEdit(today.addYears(1))
+        for edit in (self.from_in, self.to_in):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+        range_h.addWidget(QtWidgets.QLabel("From"))
+        range_h.addWidget(self.from_in)
+        range_h.addWidget(QtWidgets.QLabel("To"))
+        range_h.addWidget(self.to_in)
+        v.addLayout(range_h)
+        
+        self.listw = QtWidgets.QListWidget()
+        self.listw.itemDoubleClicked.connect(self.jump_to)
+        self.listw.verticalScrollBar().valueChanged.connect(self.maybe_load_more)
+        v.addWidget(self.listw)
+        
+        self.count_lbl = QtWidgets.QLabel("")
+        self.count_lbl.setStyleSheet("color: #555;")
+        v.addWidget(self.count_lbl)
+        self.setLayout(v)
+        
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.from_in.dateChanged.connect(self.search_timer.start)
+        self.to_in.dateChanged.connect(self.search_timer.start)
+        self.run_search()
+
+    def run_search(self):
+        self.listw.clear()
+        self.last_row = None
+        self.exhausted = False
+        self.load_page()
+
+    def load_page(self):
+        if self.exhausted:
+            return
+        start_day = to_day(self.from_in.date().toPyDate())
+        end_day = to_day(self.to_in.date().toPyDate())
+        after = (self.last_row.day, -1 if self.last_row.minute is None else self.last_row.minute, self.last_row.id) if self.last_row else None
+        rows = search_events(self.user_id, self.search_input.text(), start_day, end_day, after)
+        for row in rows:
+            time = row.time if row.time else "All day"
+            item = QtWidgets.QListWidgetItem(f"{from_day(row.day).strftime('%a %Y-%m-%d')}  [{time}]  {row.title}")
+            item.setData(QtCore.Qt.UserRole, row.date)
+            self.listw.addItem(item)
+        if rows:
+            self.last_row = rows[-1]
+        self.exhausted = len(rows) < AGENDA_PAGE_SIZE
+        suffix = "" if self.exhausted else "+ (scroll for more)"
+        self.count_lbl.setText(f"{self.listw.count()}{suffix} matching events")
+
+    def maybe_load_more(self, value):
+        if value >= self.listw.verticalScrollBar().maximum():
+            self.load_page()
+
+    def jump_to(self, item):
+        self.selected_date = item.data(QtCore.Qt.UserRole)
+        self.accept()
+
+
+class ChangePasswordDialog(QtWidgets.QDialog):
+    def __init__(self, parent, user_id, old_password):
+        super().__init__(parent)
+        self.user_id = user_id
+        self.old_password = old_password
+        self.setWindowTitle("Choose a New Password")
+        self.resize(350, 180)
+
+        v = QtWidgets.QVBoxLayout()
+        info = QtWidgets.QLabel("This account still uses its default password. Choose a new one to continue.")
+        info.setWordWrap(True)
+        v.addWidget(info)
+        self.passw = QtWidgets.QLineEdit()
+        self.passw.setPlaceholderText("New password")
+        self.passw.setEchoMode(QtWidgets.QLineEdit.Password)
+        self.confirm = QtWidgets.QLineEdit()
+        self.confirm.setPlaceholderText("Repeat new password")
+        self.confirm.setEchoMode(QtWidgets.QLineEdit.Password)
+        btn = QtWidgets.QPushButton("Change Password")
+        btn.clicked.connect(self.try_change)
+        v.addWidget(self.passw)
+        v.addWidget(self.confirm)
+        v.addWidget(btn)
+        self.setLayout(v)
+
+    def try_change(self):
+        password = self.passw.text()
+        if len(password) < 6:
+            QtWidgets.QMessageBox.warning(self, "Change Password", "The new password must be at least 6 characters.")
+        elif password != self.confirm.text():
+            QtWidgets.QMessageBox.warning(self, "Change Password", "The passwords do not match.")
+        elif password == self.old_password:
+            QtWidgets.QMessageBox.warning(self, "Change Password", "Choose a password different from the default one.")
+        else:
+            change_password(self.user_id, password)
+            self.accept()
+
+
 class LoginDialog(QtWidgets.QDialog):
     def __init__(self, parent):
         super().__init__(parent)
@@ -722,12 +1380,19 @@ class LoginDialog(QtWidgets.QDialog):
         self.passw.setPlaceholderText("Password")
         self.passw.setEchoMode(QtWidgets.QLineEdit.Password)
         
+        self.user_id = None
+        self.username = None
+        
         btn = QtWidgets.QPushButton("Log In")
         btn.clicked.connect(self.try_login)
+        register_btn = QtWidgets.QPushButton("Create Account")
+        register_btn.setStyleSheet("QPushButton { background: none; color: #555; border: 1px solid #ccc; } QPushButton:hover { color: #333; background-color: #eee; }")
+        register_btn.clicked.connect(self.try_register)
         
         v.addWidget(self.user)
         v.addWidget(self.passw)
         v.addWidget(btn)
+        v.addWidget(register_btn)
         self.setLayout(v)
         
         qr = self.frameGeometry()
@@ -736,24 +1401,59 @@ class LoginDialog(QtWidgets.QDialog):
         self.move(qr.topLeft())
 
     def try_login(self):
-        if self.user.text() == "demo" and self.passw.text() == "eduquest":
-            QtWidgets.QMessageBox.information(self, "Welcome", "Logged in as demo")
+        username = self.user.text().strip()
+        user_id = authenticate(username, self.passw.text())
+        if user_id is not None:
+            if password_change_required(user_id):
+                dlg = ChangePasswordDialog(self, user_id, self.passw.text())
+                if dlg.exec_() != QtWidgets.QDialog.Accepted:
+                    return
+            self.user_id = user_id
+            self.username = username
+            QtWidgets.QMessageBox.information(self, "Welcome", f"Logged in as {username}")
             self.accept()
         else:
             QtWidgets.QMessageBox.warning(self, "Denied", "Wrong credentials")
 
+    def try_register(self):
+        username = self.user.text().strip()
+        password = self.passw.text()
+        if not username or len(password) < 6:
+            QtWidgets.QMessageBox.warning(self, "Create Account", "Enter a username and a password of at least 6 characters.")
+            return
+        try:
+            self.user_id = create_user(username, password)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Create Account", str(e))
+            return
+        self.username = username
+        QtWidgets.QMessageBox.information(self, "Welcome", f"Account created. Logged in as {username}")
+        self.accept()
+
 
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
         self.is_logged_in = False
+        self.user_id = None
+        self.username = None
+        self.event_cache = EventCache(None)
+        self.session_tracker = SessionTracker(self)
         self.setWindowTitle("EduQuest — Desktop")
         self.resize(1200,800)
         
         init_db()
         self.setStyleSheet(GLOBAL_STYLE) 
+        self.maintenance = MaintenanceScheduler(self.session_tracker, self)
+        self.maintenance.finished.connect(self.on_maintenance_done)
+        self.note_revisions = NoteRevisionRecorder(self)
+        self.note_revisions.failed.connect(self.on_note_revision_failed)
         
         self.current_date = datetime.date.today()
+        self.week_start = week_start_of(self.current_date)
+        self.view_mode = "month"
+        self.prefetcher = None
+        self.prefetch_pending = False
         self.setup_ui()
         self.show_login_screen()
 
@@ -777,15 +1477,26 @@ class MainWindow(QtWidgets.QMainWindow):
             ("Notes", self.open_notes), 
             ("Study History", self.open_study_history), 
             ("Notifications", self.open_notifications),
+            ("Agenda", self.open_agenda),
+            ("Import .ics", self.import_calendar),
+            ("Export .ics", self.export_calendar),
+            ("Sync", None),
         ]
         
         for name, slot in btn_data:
             b = QtWidgets.QPushButton(name)
-            b.clicked.connect(slot)
+            if slot:
+                b.clicked.connect(slot)
             b.setCursor(QtCore.Qt.PointingHandCursor)
             self.header.addWidget(b)
             self.nav_buttons[name] = b
             
+        sync_menu = QtWidgets.QMenu(self)
+        sync_menu.addAction("Export Changes...", self.export_sync)
+        sync_menu.addAction("Export Everything...", lambda: self.export_sync(full=True))
+        sync_menu.addAction("Import Changes...", self.import_sync)
+        self.nav_buttons["Sync"].setMenu(sync_menu)
+            
         self.login_btn = QtWidgets.QPushButton("Login")
         self.login_btn.clicked.connect(self.handle_login_logout)
         self.header.addWidget(self.login_btn)
@@ -795,6 +1506,7 @@ class MainWindow(QtWidgets.QMainWindow):
         cal_title_h = QtWidgets.QHBoxLayout()
         self.month_year_lbl = QtWidgets.QLabel("Calendar")
         self.month_year_lbl.setStyleSheet(f"font-size: 24px; font-weight: 800; color: white; margin: 15px 0;")
+        self.month_year_lbl.setMinimumWidth(300)
         
         prev_btn = QtWidgets.QPushButton("◀")
         next_btn = QtWidgets.QPushButton("▶")
@@ -803,13 +1515,26 @@ class MainWindow(QtWidgets.QMainWindow):
         prev_btn.setStyleSheet(nav_btn_style)
         next_btn.setStyleSheet(nav_btn_style)
         
-        prev_btn.clicked.connect(lambda: self.change_month(-1))
-        next_btn.clicked.connect(lambda: self.change_month(1))
+        prev_btn.clicked.connect(lambda: self.navigate(-1))
+        next_btn.clicked.connect(lambda: self.navigate(1))
         
         cal_title_h.addWidget(prev_btn)
         cal_title_h.addWidget(self.month_year_lbl, alignment=QtCore.Qt.AlignCenter)
         cal_title_h.addWidget(next_btn)
         
+        self.view_buttons = QtWidgets.QButtonGroup(self)
+        view_btn_style = f"QPushButton {{ background-color: {CARD_BACKGROUND}; color: white; border-radius: 12px; padding: 4px 12px; }} QPushButton:checked {{ background-color: {ACCENT_COLOR}; }}"
+        cal_title_h.addStretch()
+        for mode in ("month", "week", "year"):
+            b = QtWidgets.QPushButton(mode.title())
+            b.setCheckable(True)
+            b.setChecked(mode == self.view_mode)
+            b.setStyleSheet(view_btn_style)
+            b.setCursor(QtCore.Qt.PointingHandCursor)
+            b.clicked.connect(lambda _, m=mode: self.set_view(m))
+            self.view_buttons.addButton(b)
+            cal_title_h.addWidget(b)
+        
         main_layout.addLayout(cal_title_h)
         
         self.cal_table = QtWidgets.QTableWidget(6,7)
@@ -818,13 +1543,32 @@ class MainWindow(QtWidgets.QMainWindow):
         self.cal_table.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
         self.cal_table.cellDoubleClicked.connect(self.cell_double)
         
-        main_layout.addWidget(self.cal_table, 8)
+        self.week_view = WeekTimeline()
+        self.week_view.day_activated.connect(self.open_day)
+        self.year_view = YearHeatmap()
+        self.year_view.day_activated.connect(self.open_day)
+        
+        self.view_stack = QtWidgets.QStackedWidget()
+        self.views = {"month": self.cal_table, "week": self.week_view, "year": self.year_view}
+        for view in self.views.values():
+            self.view_stack.addWidget(view)
+        main_layout.addWidget(self.view_stack, 8)
         central.setLayout(main_layout)
         
         self.status = QtWidgets.QStatusBar()
         self.status.setStyleSheet("color: white;")
         self.setStatusBar(self.status)
         
+        self.perf_overlay = QtWidgets.QLabel()
+        self.perf_overlay.setStyleSheet(f"font-family: monospace; font-size: 11px; color: #ffd54f; background-color: {CARD_BACKGROUND}; padding: 2px 6px;")
+        self.perf_overlay.setVisible(False)
+        self.status.addPermanentWidget(self.perf_overlay)
+        self.perf_timer = QtCore.QTimer(self)
+        self.perf_timer.setInterval(1000)
+        self.perf_timer.timeout.connect(self.refresh_perf_overlay)
+        QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+P"), self, activated=self.toggle_perf_overlay)
+        QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+Shift+D"), self, activated=self.dump_perf)
+        
         self.populate_calendar(self.current_date.year, self.current_date.month)
         self.update_ui_state()
 
@@ -837,7 +1581,7 @@ class MainWindow(QtWidgets.QMainWindow):
     def update_ui_state(self):
         if self.is_logged_in:
             self.login_btn.setText("Logout")
-            self.setWindowTitle("EduQuest — Desktop (Logged In)")
+            self.setWindowTitle(f"EduQuest — Desktop (Logged In as {self.username})")
         else:
             self.login_btn.setText("Login")
             self.setWindowTitle("EduQuest — Desktop (Logged Out)")
@@ -845,18 +1589,28 @@ class MainWindow(QtWidgets.QMainWindow):
         for btn in self.nav_buttons.values():
             btn.setVisible(self.is_logged_in)
             
-        self.cal_table.setEnabled(self.is_logged_in)
-        self.populate_calendar(self.current_date.year, self.current_date.month)
+        self.view_stack.setEnabled(self.is_logged_in)
+        self.refresh_view()
         
 
     def show_login_screen(self):
         dlg = LoginDialog(self)
         if dlg.exec_() == QtWidgets.QDialog.Accepted:
-            self.is_logged_in = True
-            self.update_ui_state()
+            self.login_as(dlg.user_id, dlg.username)
+
+    def login_as(self, user_id, username):
+        self.user_id = user_id
+        self.username = username
+        self.event_cache = EventCache(user_id)
+        self.is_logged_in = True
+        self.update_ui_state()
+        self.prefetch_adjacent()
 
     def logout(self):
         self.is_logged_in = False
+        self.user_id = None
+        self.username = None
+        self.event_cache = EventCache(None)
         self.update_ui_state()
         QtWidgets.QMessageBox.information(self, "Logout", "You have been logged out.")
 
@@ -864,7 +1618,91 @@ class MainWindow(QtWidgets.QMainWindow):
         new_date = self.current_date + datetime.timedelta(days=32 * delta)
         self.current_date = datetime.date(new_date.year, new_date.month, 1)
         self.populate_calendar(self.current_date.year, self.current_date.month)
+        self.prefetch_adjacent()
+
+    def prefetch_adjacent(self):
+        if not self.is_logged_in:
+            return
+        if self.prefetcher is not None and self.prefetcher.isRunning():
+            self.prefetch_pending = True
+            return
+        dates = []
+        for delta in range(-PREFETCH_MONTHS, PREFETCH_MONTHS + 1):
+            if delta:
+                month = self.current_date.month - 1 + delta
+                dates += [day.isoformat() for week in month_grid(self.current_date.year + month // 12, month % 12 + 1) for day in week]
+        missing = self.event_cache.missing(dict.fromkeys(dates))
+        if not missing:
+            return
+        self.prefetcher = EventPrefetcher(self.event_cache, missing, self)
+        self.prefetcher.fetched.connect(self.on_prefetched)
+        self.prefetcher.finished.connect(self.on_prefetch_finished)
+        self.prefetcher.start()
+
+    def on_prefetched(self, cache, rows, version):
+        if cache is self.event_cache:
+            cache.merge(rows, version)
+
+    def on_prefetch_finished(self):
+        if self.prefetch_pending:
+            self.prefetch_pending = False
+            self.prefetch_adjacent()
+
+    def navigate(self, delta):
+        if self.view_mode == "week":
+            self.go_to_date(self.week_start + datetime.timedelta(days=7 * delta))
+        elif self.view_mode == "year":
+            self.current_date = datetime.date(self.current_date.year + delta, self.current_date.month, 1)
+        else:
+            self.change_month(delta)
+            return
+        self.refresh_view()
+
+    def go_to_date(self, day):
+        self.current_date = datetime.date(day.year, day.month, 1)
+        self.week_start = week_start_of(day)
+
+    def set_view(self, mode):
+        if mode == "week" and not self.week_start <= self.current_date < self.week_start + datetime.timedelta(days=7):
+            today = datetime.date.today()
+            same_month = (today.year, today.month) == (self.current_date.year, self.current_date.month)
+            self.week_start = week_start_of(today if same_month else self.current_date)
+        self.view_mode = mode
+        for button in self.view_buttons.buttons():
+            button.setChecked(button.text().lower() == mode)
+        self.view_stack.setCurrentWidget(self.views[mode])
+        self.refresh_view()
+
+    def refresh_view(self):
+        if self.view_mode == "week":
+            self.populate_week(self.week_start)
+        elif self.view_mode == "year":
+            self.populate_year(self.current_date.year)
+        else:
+            self.populate_calendar(self.current_date.year, self.current_date.month)
 
+    def populate_week(self, start):
+        with PERF.span("populate_week:query"):
+            slots, study = week_activity(self.user_id, to_day(start))
+        self.week_view.set_week(start, slots, study)
+        end = start + datetime.timedelta(days=6)
+        self.month_year_lbl.setText(f"{start.strftime('%b %d')} – {end.strftime('%b %d, %Y')}")
+        self.status.showMessage("Week loaded successfully.")
+
+    def populate_year(self, year):
+        with PERF.span("populate_year:query"):
+            activity = day_activity(self.user_id, to_day(datetime.date(year, 1, 1)), to_day(datetime.date(year, 12, 31)))
+        self.year_view.set_year(year, activity)
+        self.month_year_lbl.setText(str(year))
+        events = sum(count for count, _ in activity.values())
+        seconds = sum(seconds for _, seconds in activity.values())
+        self.status.showMessage(f"{year}: {events} events, {seconds / 3600:.1f} hours studied.")
+
+    def open_day(self, date):
+        if not self.is_logged_in:
+            return
+        self.open_dialog(EventDialog, date)
+        self.refresh_view()
 
     def populate_calendar(self, year, month):
         self.cal_table.clearContents()
@@ -880,12 +1718,13 @@ class MainWindow(QtWidgets.QMainWindow):
         for c in range(7):
             self.cal_table.setColumnWidth(c, int(self.width() / 7) - 12)
             
-        cal = calendar.Calendar(firstweekday=6) 
-        month_days = cal.monthdatescalendar(year, month)
+        month_days = month_grid(year, month)
         
-        conn = sqlite3.connect(DB)
-        cur = conn.cursor()
+        with PERF.span("populate_calendar:query"):
+            days = self.event_cache.get_days([day.isoformat() for week in month_days for day in week])
         
+        build_started = perf_counter()
+        styles = []
         for r, week in enumerate(month_days):
             for c, day in enumerate(week):
                 cell_widget = QtWidgets.QWidget()
@@ -898,20 +1737,18 @@ class MainWindow(QtWidgets.QMainWindow):
                 if day == datetime.date.today():
                     date_lbl_style = f"font-weight:900; font-size: 18px; color:{PRIMARY_COLOR}; background-color:white; border-radius:8px; padding:4px 8px;"
                 
-                date_lbl.setStyleSheet(date_lbl_style)
+                styles.append((date_lbl, date_lbl_style))
                 layout.addWidget(date_lbl, alignment=QtCore.Qt.AlignTop | QtCore.Qt.AlignLeft)
                 
                 ev_box = QtWidgets.QVBoxLayout()
-                cur.execute("SELECT title, time FROM events WHERE date=? AND title NOT LIKE '% — %' ORDER BY time", (day.isoformat(),))
-                evs = cur.fetchall()
                 
-                for ev in evs:
-                    title = ev[0]
-                    time = ev[1] if ev[1] else ""
-                    display_text = f"{time} {title}" if time else title
+                for ev in days[day.isoformat()]:
+                    if is_flashcard(ev.title):
+                        continue
+                    display_text = f"{ev.time} {ev.title}" if ev.time else ev.title
                     
                     ev_lbl = QtWidgets.QLabel(display_text)
-                    ev_lbl.setStyleSheet(EVENT_LABEL_STYLE)
+                    styles.append((ev_lbl, EVENT_LABEL_STYLE))
                     ev_lbl.setWordWrap(True)
                     ev_box.addWidget(ev_lbl)
                     
@@ -921,12 +1758,16 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.cal_table.setCellWidget(r, c, cell_widget)
                 
                 if day.month != month:
-                    cell_widget.setStyleSheet(f"QWidget {{ background-color: {CARD_BACKGROUND}cc; border-radius: 8px; margin: 4px; }}")
+                    styles.append((cell_widget, f"QWidget {{ background-color: {CARD_BACKGROUND}cc; border-radius: 8px; margin: 4px; }}"))
                     cell_widget.setDisabled(True)
                 else:
-                    cell_widget.setStyleSheet(f"QWidget {{ background-color: {CARD_BACKGROUND}; border-radius: 8px; margin: 4px; }}")
+                    styles.append((cell_widget, f"QWidget {{ background-color: {CARD_BACKGROUND}; border-radius: 8px; margin: 4px; }}"))
+        PERF.record("populate_calendar:build", perf_counter() - build_started)
+        
+        with PERF.span("populate_calendar:style"):
+            for widget, style in styles:
+                widget.setStyleSheet(style)
                     
-        conn.close()
         self.month_year_lbl.setText(f"{calendar.month_name[month]} {year}")
         self.status.showMessage("Calendar loaded successfully.")
 
@@ -934,8 +1775,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if not self.is_logged_in:
             return
             
-        cal = calendar.Calendar(firstweekday=6)
-        month_days = cal.monthdatescalendar(self.current_date.year, self.current_date.month)
+        month_days = month_grid(self.current_date.year, self.current_date.month)
         try:
             day = month_days[row][col]
         except Exception:
@@ -944,49 +1784,185 @@ class MainWindow(QtWidgets.QMainWindow):
         if day.month != self.current_date.month:
             return
             
-        dlg = EventDialog(self, day.isoformat())
-        dlg.exec_()
+        self.open_dialog(EventDialog, day.isoformat())
         self.populate_calendar(self.current_date.year, self.current_date.month)
 
     def show_calendar(self):
         if self.is_logged_in:
-            self.populate_calendar(self.current_date.year, self.current_date.month)
+            self.set_view("month")
+
+    def open_dialog(self, dialog_cls, *args):
+        if not PERF.enabled:
+            dlg = dialog_cls(self, *args)
+            dlg.exec_()
+            return dlg
+        started = perf_counter()
+        with PERF.span(f"dialog_init:{dialog_cls.__name__}"):
+            dlg = dialog_cls(self, *args)
+        FirstPaintProbe(dlg, dialog_cls.__name__, started)
+        dlg.exec_()
+        return dlg
+
+    def toggle_perf_overlay(self):
+        visible = not self.perf_overlay.isVisible()
+        PERF.set_enabled(visible)
+        self.perf_overlay.setVisible(visible)
+        if visible:
+            self.refresh_perf_overlay()
+            self.perf_timer.start()
+        else:
+            self.perf_timer.stop()
+
+    def refresh_perf_overlay(self):
+        top = sorted(PERF.summary().items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:4]
+        parts = [f"{name} {s['mean_ms']:.1f}ms×{s['count']}" for name, s in top]
+        widgets = sum(v for k, v in PERF.snapshot()[1].items() if k.startswith("widget:"))
+        cache = self.event_cache.stats()
+        parts.append(f"widgets {widgets}")
+        parts.append(f"cache {cache['hits']}/{cache['hits'] + cache['misses']} hits")
+        self.perf_overlay.setText(" | ".join(parts))
+
+    def dump_perf(self):
+        try:
+            path = PERF.dump()
+            self.status.showMessage(f"Performance samples written to {path}.", 5000)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Error", f"Could not write performance samples: {e}")
 
     def open_notes(self):
         if self.is_logged_in:
-            dlg = NotesDialog(self)
-            dlg.exec_()
+            self.open_dialog(NotesDialog)
 
     def open_flashcard_viewer(self):
         if self.is_logged_in:
-            dlg = FlashcardViewerDialog(self)
-            dlg.exec_()
+            self.open_dialog(FlashcardViewerDialog)
             
     def open_flashcard_adder(self):
         if self.is_logged_in:
-            dlg = FlashcardsDialog(self)
-            dlg.exec_()
+            self.open_dialog(FlashcardsDialog)
 
     def open_notifications(self):
         if self.is_logged_in:
-            dlg = NotificationsDialog(self)
-            dlg.exec_()
+            self.open_dialog(NotificationsDialog)
+
+    def open_agenda(self):
+        if not self.is_logged_in:
+            return
+        dlg = self.open_dialog(AgendaDialog)
+        if dlg.result() == QtWidgets.QDialog.Accepted and dlg.selected_date:
+            self.go_to_date(datetime.date.fromisoformat(dlg.selected_date))
+            self.refresh_view()
+            self.open_day(dlg.selected_date)
 
     def open_study_history(self):
         if self.is_logged_in:
-            dlg = StudyHistoryDialog(self)
-            dlg.exec_()
+            self.open_dialog(StudyHistoryDialog)
+
+    def import_calendar(self):
+        if not self.is_logged_in:
+            return
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Import iCalendar", "", "iCalendar files (*.ics);;All files (*)")
+        if not path:
+            return
+        self.import_progress = QtWidgets.QProgressDialog("Importing events...", None, 0, 100, self)
+        self.import_progress.setWindowTitle("Import .ics")
+        self.import_progress.setWindowModality(QtCore.Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_worker = IcsImportWorker(path, self.user_id, self)
+        self.import_worker.progress.connect(self.on_import_progress)
+        self.import_worker.done.connect(self.on_import_done)
+        self.import_worker.failed.connect(self.on_import_failed)
+        self.import_worker.start()
+
+    def on_import_progress(self, processed, inserted, percent):
+        self.import_progress.setValue(percent)
+        self.import_progress.setLabelText(f"Processed {processed} events ({inserted} new)...")
+
+    def on_import_done(self, processed, inserted, skipped):
+        self.import_progress.close()
+        self.event_cache.clear()
+        self.refresh_view()
+        message = f"Imported {inserted} new events ({processed - inserted} duplicates skipped)."
+        if skipped:
+            message += f" {skipped} events with unreadable dates or unsupported repeat rules were not imported."
+        self.status.showMessage(message, 5000)
+
+    def on_import_failed(self, message):
+        self.import_progress.close()
+        QtWidgets.QMessageBox.critical(self, "Import Failed", f"Could not import calendar: {message}")
+
+    def export_calendar(self):
+        if not self.is_logged_in:
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export iCalendar", "eduquest.ics", "iCalendar files (*.ics)")
+        if not path:
+            return
+        try:
+            count = export_ics(path, self.user_id)
+            self.status.showMessage(f"Exported {count} events to {path}.", 5000)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Export Failed", f"Could not export calendar: {e}")
+
+    def export_sync(self, full=False):
+        if not self.is_logged_in:
+            return
+        default = f"eduquest-{self.username}-{datetime.date.today().isoformat()}.eqsync"
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Export Sync Bundle", default, "EduQuest sync bundles (*.eqsync)")
+        if not path:
+            return
+        try:
+            count = export_sync_bundle(path, self.user_id, self.username, full=full)
+            self.status.showMessage(f"Exported {count} changes to {path}.", 5000)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Sync Failed", f"Could not export changes: {e}")
+
+    def import_sync(self):
+        if not self.is_logged_in:
+            return
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Import Sync Bundle", "", "EduQuest sync bundles (*.eqsync);;All files (*)")
+        if not path:
+            return
+        try:
+            applied, skipped = import_sync_bundle(path, self.user_id)
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Sync Failed", f"Could not import changes: {e}")
+            return
+        self.event_cache.clear()
+        self.refresh_view()
+        self.status.showMessage(f"Merged {applied} changes ({skipped} already up to date).", 5000)
 
     def open_login(self):
         dlg = LoginDialog(self)
         if dlg.exec_() == QtWidgets.QDialog.Accepted:
-            self.is_logged_in = True
-            self.update_ui_state()
+            self.login_as(dlg.user_id, dlg.username)
+
+    def on_maintenance_done(self, results):
+        failed = {task: detail for task, (ok, detail) in results.items() if not ok}
+        if "integrity" in failed:
+            backups = list_backups()
+            hint = f"\n\nThe most recent backup is {backups[-1]}." if backups else ""
+            QtWidgets.QMessageBox.warning(self, "Database Problem", f"The integrity check found problems: {failed['integrity']}{hint}")
+        elif failed:
+            self.status.showMessage(f"Database maintenance failed: {'; '.join(failed.values())}", 5000)
+        elif results:
+            self.status.showMessage(f"Database maintenance finished ({', '.join(results)}).", 5000)
+
+    def on_note_revision_failed(self, message):
+        self.status.showMessage(f"Could not record note history: {message}", 5000)
+
+    def closeEvent(self, event):
+        self.prefetch_pending = False
+        if self.prefetcher is not None:
+            self.prefetcher.wait()
+        self.maintenance.stop()
+        self.note_revisions.stop()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     init_db() 
     
     app = QtWidgets.QApplication(sys.argv)
+    PERF.set_enabled(os.environ.get("EDUQUEST_PERF") == "1")
     
     logo_path = os.path.join(os.getcwd(), "eduquest_logo.png")
     if not os.path.exists(logo_path):
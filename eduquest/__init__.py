@@ -0,0 +1 @@
+"""Qt-free EduQuest data layer shared by the desktop app and the command line."""
@@ -0,0 +1,245 @@
+import os, sys, json, sqlite3, getpass, argparse, datetime
+
+from . import db
+from .db import to_day, local_midnight_ts
+from .schema import ensure_db
+from .users import create_user, find_user
+from .events import AGENDA_PAGE_SIZE, add_event, delete_event, search_events, day_activity
+from .flashcards import add_flashcard, list_flashcards
+from .notes import list_notes, save_note
+from .sessions import list_sessions, study_totals, format_seconds
+from .ics import import_ics, export_ics
+from .sync import export_sync_bundle, import_sync_bundle
+from .maintenance import MAINTENANCE_TASKS, due_maintenance, run_maintenance
+
+
+def emit(args, rows, columns):
+    if args.json:
+        json.dump([dict(zip(columns, row)) for row in rows], sys.stdout, indent=2, default=str)
+        sys.stdout.write("\n")
+    else:
+        for row in rows:
+            print("\t".join("" if value is None else str(value) for value in row))
+
+
+def clock_time(text):
+    try:
+        return datetime.time.fromisoformat(text).strftime("%H:%M")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time {text!r}: use 24-hour HH:MM, e.g. 09:30") from None
+
+
+def iter_events(user_id, text, start, end):
+    after = None
+    while True:
+        page = search_events(user_id, text, to_day(start), to_day(end), after=after)
+        yield from page
+        if len(page) < AGENDA_PAGE_SIZE:
+            return
+        after = (page[-1].day, -1 if page[-1].minute is None else page[-1].minute, page[-1].id)
+
+
+def cmd_add_event(args, user_id):
+    print(add_event(user_id, args.date, args.title, args.time))
+
+def cmd_add_card(args, user_id):
+    print(add_flashcard(user_id, args.front, args.back, args.date))
+
+def cmd_add_note(args, user_id):
+    if args.file == "-":
+        body = sys.stdin.read()
+    elif args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            body = f.read()
+    else:
+        body = args.body or ""
+    print(save_note(user_id, args.title.strip(), body.strip()))
+
+def cmd_add_user(args, user_id):
+    password = os.environ.get("EDUQUEST_PASSWORD") or getpass.getpass(f"Password for {args.username}: ")
+    if len(password) < 6:
+        print("Password must be at least 6 characters.", file=sys.stderr)
+        return 1
+    try:
+        print(create_user(args.username, password))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+def cmd_delete_event(args, user_id):
+    if not delete_event(user_id, args.id):
+        print(f"No event {args.id}.", file=sys.stderr)
+        return 1
+
+def cmd_list_events(args, user_id):
+    rows = ((ev.id, ev.date, ev.time, ev.title) for ev in iter_events(user_id, args.search or "", args.start, args.end))
+    emit(args, rows, ("id", "date", "time", "title"))
+
+def cmd_list_cards(args, user_id):
+    emit(args, list_flashcards(user_id, args.date), ("id", "front", "back"))
+
+def cmd_list_notes(args, user_id):
+    rows = sorted((os.path.basename(fpath), title) for title, fpath in list_notes(user_id).items())
+    emit(args, rows, ("note", "title"))
+
+def cmd_list_sessions(args, user_id):
+    rows = ((s.type, s.start.isoformat(sep=" "), s.end.isoformat(sep=" "), s.duration_seconds)
+            for s in list_sessions(user_id, args.limit))
+    emit(args, rows, ("type", "start", "end", "duration_seconds"))
+
+def cmd_import_ics(args, user_id):
+    processed, inserted, skipped = import_ics(args.path, user_id)
+    print(f"Imported {inserted} new events ({processed - inserted} duplicates skipped).")
+    if skipped:
+        print(f"{skipped} events with unreadable dates or unsupported repeat rules were not imported.", file=sys.stderr)
+
+def cmd_import_sync(args, user_id):
+    applied, skipped = import_sync_bundle(args.path, user_id)
+    print(f"Merged {applied} changes ({skipped} already up to date).")
+
+def cmd_export_ics(args, user_id):
+    print(f"Exported {export_ics(args.path, user_id)} events to {args.path}.")
+
+def cmd_export_sync(args, user_id):
+    count = export_sync_bundle(args.path, user_id, args.user, peer=args.peer, full=args.full)
+    print(f"Exported {count} changes to {args.path}.")
+
+def cmd_report(args, user_id):
+    start_day, end_day = to_day(args.start), to_day(args.end)
+    activity = day_activity(user_id, start_day, end_day)
+    totals = study_totals(user_id, local_midnight_ts(start_day), local_midnight_ts(end_day + 1))
+    report = {
+        "user": args.user,
+        "from": args.start.isoformat(),
+        "to": args.end.isoformat(),
+        "events": sum(events for events, _ in activity.values()),
+        "busy_days": sum(1 for events, _ in activity.values() if events),
+        "study_days": sum(1 for _, seconds in activity.values() if seconds),
+        "study_seconds": sum(seconds for _, seconds in totals.values()),
+        "study_by_type": {kind: {"sessions": count, "seconds": seconds} for kind, (count, seconds) in totals.items()},
+        "flashcards_today": len(list_flashcards(user_id)),
+        "notes": len(list_notes(user_id)),
+    }
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    print(f"Report for {report['user']}: {report['from']} to {report['to']}")
+    print(f"  Events:          {report['events']} on {report['busy_days']} days")
+    print(f"  Study time:      {format_seconds(report['study_seconds'])} on {report['study_days']} days")
+    for kind, totals in report["study_by_type"].items():
+        print(f"    {kind:<14} {format_seconds(totals['seconds'])} in {totals['sessions']} sessions")
+    print(f"  Flashcards today: {report['flashcards_today']}")
+    print(f"  Notes:           {report['notes']}")
+
+def cmd_maintain(args, user_id):
+    unknown = set(args.tasks) - set(MAINTENANCE_TASKS)
+    if unknown:
+        print(f"Unknown maintenance tasks: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 1
+    tasks = args.tasks or (due_maintenance() if args.due else list(MAINTENANCE_TASKS))
+    failed = 0
+    for task, (ok, detail) in run_maintenance(tasks).items():
+        print(f"{task}: {'ok' if ok else 'FAILED'} ({detail})")
+        failed += not ok
+    return 1 if failed else 0
+
+
+def build_parser():
+    today = datetime.date.today()
+    date = datetime.date.fromisoformat
+    parser = argparse.ArgumentParser(prog="eduquest", description="Headless access to EduQuest calendars, flashcards, notes and study history.")
+    parser.add_argument("--db", help=f"database file (default: {db.DB})")
+    parser.add_argument("--notes-dir", help=f"notes directory (default: {db.NOTES_DIR})")
+    parser.add_argument("-u", "--user", default=os.environ.get("EDUQUEST_USER"),
+                        help="account to act on (default: $EDUQUEST_USER)")
+    parser.add_argument("--json", action="store_true", help="print lists and reports as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add events, flashcards, notes or accounts").add_subparsers(dest="kind", required=True)
+    p = add.add_parser("event")
+    p.add_argument("date", type=date)
+    p.add_argument("title")
+    p.add_argument("--time", type=clock_time, help="HH:MM, 24-hour")
+    p.set_defaults(func=cmd_add_event)
+    p = add.add_parser("card")
+    p.add_argument("front")
+    p.add_argument("back")
+    p.add_argument("--date", type=date)
+    p.set_defaults(func=cmd_add_card)
+    p = add.add_parser("note")
+    p.add_argument("title")
+    p.add_argument("--body")
+    p.add_argument("--file", help="read the body from a file, or - for stdin")
+    p.set_defaults(func=cmd_add_note)
+    p = add.add_parser("user", help="create an account (password from $EDUQUEST_PASSWORD or a prompt)")
+    p.add_argument("username")
+    p.set_defaults(func=cmd_add_user, needs_user=False)
+
+    p = commands.add_parser("delete", help="delete an event or flashcard by id")
+    p.add_argument("id", type=int)
+    p.set_defaults(func=cmd_delete_event)
+
+    lister = commands.add_parser("list", help="list events, flashcards, notes or study sessions").add_subparsers(dest="kind", required=True)
+    p = lister.add_parser("events")
+    p.add_argument("--from", dest="start", type=date, default=today)
+    p.add_argument("--to", dest="end", type=date, default=today + datetime.timedelta(days=30))
+    p.add_argument("--search")
+    p.set_defaults(func=cmd_list_events)
+    p = lister.add_parser("cards")
+    p.add_argument("--date", type=date)
+    p.set_defaults(func=cmd_list_cards)
+    lister.add_parser("notes").set_defaults(func=cmd_list_notes)
+    p = lister.add_parser("sessions")
+    p.add_argument("--limit", type=int, default=-1)
+    p.set_defaults(func=cmd_list_sessions)
+
+    importer = commands.add_parser("import", help="import an .ics calendar or a sync bundle").add_subparsers(dest="kind", required=True)
+    for kind, func in (("ics", cmd_import_ics), ("sync", cmd_import_sync)):
+        p = importer.add_parser(kind)
+        p.add_argument("path")
+        p.set_defaults(func=func)
+
+    exporter = commands.add_parser("export", help="export an .ics calendar or a sync bundle").add_subparsers(dest="kind", required=True)
+    p = exporter.add_parser("ics")
+    p.add_argument("path")
+    p.set_defaults(func=cmd_export_ics)
+    p = exporter.add_parser("sync")
+    p.add_argument("path")
+    p.add_argument("--full", action="store_true", help="export everything instead of changes since the last export")
+    p.add_argument("--peer", default="default")
+    p.set_defaults(func=cmd_export_sync)
+
+    p = commands.add_parser("report", help="summarise events and study time")
+    p.add_argument("--from", dest="start", type=date, default=today - datetime.timedelta(days=29))
+    p.add_argument("--to", dest="end", type=date, default=today)
+    p.set_defaults(func=cmd_report)
+
+    p = commands.add_parser("maintain", help="run database maintenance and backups")
+    p.add_argument("tasks", nargs="*", metavar="task", help=f"tasks to run: {', '.join(MAINTENANCE_TASKS)} (default: all)")
+    p.add_argument("--due", action="store_true", help="only run tasks whose schedule is due")
+    p.set_defaults(func=cmd_maintain, needs_user=False)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        db.DB = args.db
+    if args.notes_dir:
+        db.NOTES_DIR = args.notes_dir
+    ensure_db()
+    user_id = None
+    if getattr(args, "needs_user", True):
+        if not args.user:
+            print("Choose an account with --user or $EDUQUEST_USER.", file=sys.stderr)
+            return 1
+        user_id = find_user(args.user)
+        if user_id is None:
+            print(f"No such user: {args.user}", file=sys.stderr)
+            return 1
+    try:
+        return args.func(args, user_id) or 0
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
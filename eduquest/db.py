@@ -0,0 +1,48 @@
+import os, sqlite3, datetime, uuid
+
+from .perf import PERF, TimedConnection
+
+DB = 'eduquest_gui.db'
+NOTES_DIR = 'eduquest_notes'
+
+def connect_db():
+    if PERF.enabled:
+        return sqlite3.connect(DB, factory=TimedConnection)
+    return sqlite3.connect(DB)
+
+def table_columns(c, table):
+    return {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+
+def user_notes_dir(user_id):
+    path = os.path.join(NOTES_DIR, f"user_{user_id}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+def to_day(date):
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    return date.toordinal() - EPOCH_ORDINAL
+
+def from_day(day):
+    return datetime.date.fromordinal(day + EPOCH_ORDINAL)
+
+def local_midnight_ts(day):
+    return int(datetime.datetime.combine(from_day(day), datetime.time()).timestamp())
+
+def to_minute(time):
+    if not time:
+        return None
+    hours, minutes = time.split(":")[:2]
+    if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+        raise ValueError(f"invalid time of day: {time}")
+    return int(hours) * 60 + int(minutes)
+
+def from_minute(minute):
+    if minute is None:
+        return None
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def new_uid():
+    return uuid.uuid4().hex
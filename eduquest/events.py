@@ -0,0 +1,222 @@
+import sys, sqlite3, calendar
+from collections import OrderedDict, namedtuple
+
+from .db import connect_db, to_day, from_day, to_minute, from_minute, local_midnight_ts, new_uid
+
+EVENT_CACHE_SIZE = 6 * 42
+AGENDA_PAGE_SIZE = 100
+
+class EventRow(namedtuple("EventRow", "id title day minute")):
+    __slots__ = ()
+
+    @property
+    def date(self):
+        return from_day(self.day).isoformat()
+
+    @property
+    def time(self):
+        return from_minute(self.minute)
+
+class EventCache:
+    def __init__(self, user_id, max_days=EVENT_CACHE_SIZE):
+        self.user_id = user_id
+        self.max_days = max_days
+        self.days = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetched = 0
+        self.version = 0
+        self.cleared = 0
+        self.stamps = {}
+
+    def get_day(self, date):
+        return self.get_days([date])[date]
+
+    def get_days(self, dates):
+        result = {}
+        missing = []
+        for date in dates:
+            if date in self.days:
+                self.days.move_to_end(date)
+                result[date] = self.days[date]
+                self.hits += 1
+            else:
+                missing.append(date)
+                self.misses += 1
+        if missing:
+            fetched = self.fetch(missing)
+            for date in missing:
+                result[date] = fetched[date]
+                self.put(date, fetched[date])
+        return result
+
+    def fetch(self, dates):
+        fetched = {date: [] for date in dates}
+        by_day = {to_day(date): fetched[date] for date in dates}
+        days = list(by_day)
+        conn = connect_db()
+        try:
+            for i in range(0, len(days), 500):
+                chunk = days[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                cur = conn.execute(f"SELECT id, title, day, minute FROM events WHERE user_id=? AND day IN ({marks}) ORDER BY day, minute, id",
+                                   (self.user_id, *chunk))
+                for row in cur:
+                    by_day[row[2]].append(EventRow(*row))
+        finally:
+            conn.close()
+        return fetched
+
+    def put(self, date, rows):
+        self.days[date] = rows
+        self.days.move_to_end(date)
+        while len(self.days) > self.max_days:
+            self.days.popitem(last=False)
+            self.evictions += 1
+
+    def missing(self, dates):
+        return [date for date in dates if date not in self.days]
+
+    def merge(self, fetched, version):
+        # Rows fetched in the background are dropped for any date written to after the fetch began.
+        if self.cleared > version:
+            return 0
+        merged = 0
+        for date, rows in fetched.items():
+            if date in self.days or self.stamps.get(date, 0) > version:
+                continue
+            self.put(date, rows)
+            merged += 1
+        self.prefetched += merged
+        return merged
+
+    def invalidate(self, *dates):
+        self.version += 1
+        for date in dates:
+            self.days.pop(date, None)
+            self.stamps[date] = self.version
+
+    def clear(self):
+        self.version += 1
+        self.cleared = self.version
+        self.stamps.clear()
+        self.days.clear()
+
+    def stats(self):
+        return {"size": len(self.days), "max_days": self.max_days, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "prefetched": self.prefetched}
+
+def month_grid(year, month):
+    return calendar.Calendar(firstweekday=6).monthdatescalendar(year, month)
+
+def add_event(user_id, date, title, time=None):
+    conn = connect_db()
+    try:
+        with conn:
+            return conn.execute("INSERT INTO events (user_id, uid, title, day, minute) VALUES (?,?,?,?,?)",
+                                (user_id, new_uid(), title, to_day(date), to_minute(time))).lastrowid
+    finally:
+        conn.close()
+
+def delete_event(user_id, event_id):
+    conn = connect_db()
+    try:
+        with conn:
+            return conn.execute("DELETE FROM events WHERE id=? AND user_id=?", (event_id, user_id)).rowcount
+    finally:
+        conn.close()
+
+def init_search():
+    conn = connect_db()
+    c = conn.cursor()
+    try:
+        c.execute("SELECT 1 FROM sqlite_master WHERE name='events_fts'")
+        if c.fetchone() is None:
+            print("MIGRATING DATABASE: Building trigram search index for events.", file=sys.stderr)
+            c.execute("CREATE VIRTUAL TABLE events_fts USING fts5(title, content='events', content_rowid='id', tokenize='trigram')")
+            c.execute("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+                INSERT INTO events_fts (rowid, title) VALUES (NEW.id, NEW.title);
+            END
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+                INSERT INTO events_fts (events_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+            END
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title ON events BEGIN
+                INSERT INTO events_fts (events_fts, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+                INSERT INTO events_fts (rowid, title) VALUES (NEW.id, NEW.title);
+            END
+        """)
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        print(f"Trigram search unavailable, falling back to LIKE scans: {e}", file=sys.stderr)
+    finally:
+        conn.close()
+
+def search_events(user_id, text, start_day, end_day, after=None, limit=AGENDA_PAGE_SIZE):
+    text = text.strip()
+    after = after or (start_day - 1, -1, 0)
+    where = "e.user_id=? AND e.day BETWEEN ? AND ? AND e.title NOT LIKE '% — %' AND (e.day, COALESCE(e.minute, -1), e.id) > (?,?,?)"
+    params = [user_id, start_day, end_day, *after]
+    conn = connect_db()
+    try:
+        has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name='events_fts'").fetchone() is not None
+        if len(text) >= 3 and has_fts:
+            sql = f"SELECT e.id, e.title, e.day, e.minute FROM events_fts CROSS JOIN events e ON e.id = events_fts.rowid WHERE events_fts MATCH ? AND {where}"
+            params.insert(0, '"' + text.replace('"', '""') + '"')
+        elif text:
+            sql = f"SELECT e.id, e.title, e.day, e.minute FROM events e WHERE e.title LIKE ? ESCAPE '\\' AND {where}"
+            params.insert(0, "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        else:
+            sql = f"SELECT e.id, e.title, e.day, e.minute FROM events e WHERE {where}"
+        sql += " ORDER BY e.day, COALESCE(e.minute, -1), e.id LIMIT ?"
+        params.append(limit)
+        return [EventRow(*row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+SESSION_LOCAL_DAY = "CAST(julianday(start_ts, 'unixepoch', 'localtime') - 2440587.5 AS INTEGER)"
+
+def day_activity(user_id, start_day, end_day):
+    conn = connect_db()
+    try:
+        rows = conn.execute(f"""
+            SELECT day, SUM(events), SUM(seconds) FROM (
+                SELECT day, 1 AS events, 0 AS seconds FROM events
+                WHERE user_id=? AND day BETWEEN ? AND ? AND title NOT LIKE '% — %'
+                UNION ALL
+                SELECT {SESSION_LOCAL_DAY}, 0, duration_seconds FROM study_sessions
+                WHERE user_id=? AND start_ts >= ? AND start_ts < ?
+            ) GROUP BY day
+        """, (user_id, start_day, end_day, user_id, local_midnight_ts(start_day), local_midnight_ts(end_day + 1))).fetchall()
+    finally:
+        conn.close()
+    return {day: (events, seconds) for day, events, seconds in rows}
+
+def week_activity(user_id, start_day, days=7):
+    end_day = start_day + days - 1
+    slots, study = {}, {}
+    conn = connect_db()
+    try:
+        rows = conn.execute(f"""
+            SELECT day, minute, COUNT(*), group_concat(title, char(10)), 0 FROM events
+            WHERE user_id=? AND day BETWEEN ? AND ? AND title NOT LIKE '% — %'
+            GROUP BY day, minute
+            UNION ALL
+            SELECT {SESSION_LOCAL_DAY} AS day, -1, 0, NULL, SUM(duration_seconds) FROM study_sessions
+            WHERE user_id=? AND start_ts >= ? AND start_ts < ?
+            GROUP BY day
+        """, (user_id, start_day, end_day, user_id, local_midnight_ts(start_day), local_midnight_ts(end_day + 1))).fetchall()
+    finally:
+        conn.close()
+    for day, minute, count, titles, seconds in rows:
+        if minute == -1:
+            study[day] = seconds
+        else:
+            slots.setdefault(day, []).append((minute, count, titles.split("\n")))
+    return slots, study
@@ -0,0 +1,32 @@
+import datetime
+
+from .db import connect_db, to_day, new_uid
+
+FLASHCARD_SEPARATOR = " — "
+
+def is_flashcard(title):
+    return FLASHCARD_SEPARATOR in title
+
+def split_flashcard(title):
+    front, back = title.split(FLASHCARD_SEPARATOR, 1)
+    return front, back
+
+def add_flashcard(user_id, front, back, date=None):
+    date = date or datetime.date.today()
+    conn = connect_db()
+    try:
+        with conn:
+            return conn.execute("INSERT INTO events (user_id, uid, title, day) VALUES (?,?,?,?)",
+                                (user_id, new_uid(), front + FLASHCARD_SEPARATOR + back, to_day(date))).lastrowid
+    finally:
+        conn.close()
+
+def list_flashcards(user_id, date=None):
+    date = date or datetime.date.today()
+    conn = connect_db()
+    try:
+        rows = conn.execute("SELECT id, title FROM events WHERE user_id=? AND day=? AND title LIKE ? ORDER BY id",
+                            (user_id, to_day(date), f"%{FLASHCARD_SEPARATOR}%")).fetchall()
+    finally:
+        conn.close()
+    return [(card_id, *split_flashcard(title)) for card_id, title in rows]
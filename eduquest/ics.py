@@ -0,0 +1,294 @@
+import os, datetime, hashlib, itertools, zoneinfo
+
+from .db import connect_db, to_day, from_day
+
+ICS_BATCH_SIZE = 500
+ICS_RECURRENCE_HORIZON_DAYS = 730
+ICS_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+def ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ics_unescape(text):
+    out = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+def ics_fold(line):
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+        limit = 74
+    return "\r\n ".join(parts) + "\r\n"
+
+def iter_ics_lines(f):
+    pending = None
+    for raw in f:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+def ics_params(params):
+    out = {}
+    for part in params.split(";"):
+        key, _, value = part.partition("=")
+        if key:
+            out[key.strip().upper()] = value.strip().strip('"')
+    return out
+
+def parse_ics_datetime(params, value):
+    """Return (start, tz): a date for all-day values, otherwise the wall-clock
+    datetime and the zone it is written in (None for floating time)."""
+    value = value.strip()
+    params = ics_params(params)
+    if params.get("VALUE", "").upper() == "DATE" or len(value) == 8:
+        return datetime.datetime.strptime(value[:8], "%Y%m%d").date(), None
+    start = datetime.datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return start, datetime.timezone.utc
+    try:
+        return start, zoneinfo.ZoneInfo(params["TZID"]) if params.get("TZID") else None
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        # Non-IANA names (e.g. Windows zone names) are read as floating local time.
+        return start, None
+
+def ics_local(start, tz):
+    if tz is None or not isinstance(start, datetime.datetime):
+        return start
+    return start.replace(tzinfo=tz).astimezone().replace(tzinfo=None)
+
+def ics_occurrence_key(local):
+    if isinstance(local, datetime.datetime):
+        return local.strftime("%Y%m%dT%H%M")
+    return local.strftime("%Y%m%d")
+
+def parse_rrule(rule):
+    parts = ics_params(rule)
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "WKST"}
+    if unsupported:
+        raise ValueError(f"unsupported RRULE parts: {', '.join(sorted(unsupported))}")
+    freq = parts.get("FREQ", "").upper()
+    if freq not in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+        raise ValueError(f"unsupported RRULE frequency: {freq or 'none'}")
+    byday = None
+    if "BYDAY" in parts:
+        if freq not in ("DAILY", "WEEKLY"):
+            raise ValueError(f"unsupported RRULE BYDAY for {freq}")
+        byday = {ICS_WEEKDAYS.index(day.strip().upper()) for day in parts["BYDAY"].split(",")}
+    interval = int(parts.get("INTERVAL", 1))
+    if interval < 1:
+        raise ValueError(f"invalid RRULE interval: {interval}")
+    count = int(parts["COUNT"]) if "COUNT" in parts else None
+    wkst = ICS_WEEKDAYS.index(parts.get("WKST", "MO").upper())
+    return freq, interval, count, parts.get("UNTIL"), byday, wkst
+
+def iter_rrule_candidates(start, limit, freq, interval, byday, wkst):
+    step = itertools.count(0, interval)
+    if freq == "DAILY":
+        for n in step:
+            occurrence = start + datetime.timedelta(days=n)
+            if occurrence > limit:
+                return
+            if byday is None or occurrence.weekday() in byday:
+                yield occurrence
+    elif freq == "WEEKLY":
+        week = start - datetime.timedelta(days=(start.weekday() - wkst) % 7)
+        days = sorted((day - wkst) % 7 for day in (byday or {start.weekday()}))
+        for n in step:
+            for offset in days:
+                occurrence = week + datetime.timedelta(days=7 * n + offset)
+                if occurrence >= start:
+                    yield occurrence
+    else:
+        for n in step:
+            years, month = divmod(start.month - 1 + (n if freq == "MONTHLY" else 0), 12)
+            years += n if freq == "YEARLY" else 0
+            if start.year + years > limit.year:
+                return
+            try:
+                yield start.replace(year=start.year + years, month=month + 1)
+            except ValueError:
+                continue  # the 31st, or 29 February, does not occur that month
+
+def expand_rrule(start, tz, rule, horizon):
+    """Yield the wall-clock starts of a recurring event, DTSTART first, bounded
+    by the rule's COUNT/UNTIL and by the horizon date."""
+    freq, interval, count, until, byday, wkst = parse_rrule(rule)
+    is_datetime = isinstance(start, datetime.datetime)
+    limit = datetime.datetime.combine(horizon, datetime.time.max) if is_datetime else horizon
+    if until:
+        until, until_tz = parse_ics_datetime("", until)
+        if is_datetime and not isinstance(until, datetime.datetime):
+            until = datetime.datetime.combine(until, datetime.time.max)
+        elif is_datetime and until_tz is not None:
+            until = until.replace(tzinfo=until_tz).astimezone(tz).replace(tzinfo=None)
+        elif not is_datetime and isinstance(until, datetime.datetime):
+            until = until.date()
+        limit = min(limit, until)
+    candidates = iter_rrule_candidates(start, limit, freq, interval, byday, wkst)
+    occurrences = itertools.chain([start], (occurrence for occurrence in candidates if occurrence > start))
+    for emitted, occurrence in enumerate(occurrences):
+        if occurrence > limit or (count is not None and emitted >= count):
+            return
+        yield occurrence
+
+def iter_ics_events(f):
+    event = None
+    for line in iter_ics_lines(f):
+        name, sep, value = line.partition(":")
+        if not sep:
+            continue
+        name, _, params = name.partition(";")
+        name = name.upper()
+        if name == "BEGIN" and value.strip().upper() == "VEVENT":
+            event = {"exdates": []}
+        elif name == "END" and value.strip().upper() == "VEVENT":
+            if event is not None:
+                if not event.get("uid") and event.get("title") and event.get("start"):
+                    local = ics_local(event["start"], event["tz"])
+                    if isinstance(local, datetime.datetime):
+                        key = f"{local.date().isoformat()}|{local.strftime('%H:%M')}|{event['title']}"
+                    else:
+                        key = f"{local.isoformat()}||{event['title']}"
+                    event["uid"] = hashlib.sha1(key.encode("utf-8")).hexdigest()
+                yield event
+            event = None
+        elif event is not None:
+            try:
+                if name == "UID":
+                    event["uid"] = value.strip()
+                elif name == "SUMMARY":
+                    event["title"] = ics_unescape(value).strip()
+                elif name == "STATUS":
+                    event["cancelled"] = value.strip().upper() == "CANCELLED"
+                elif name == "DTSTART":
+                    event["start"], event["tz"] = parse_ics_datetime(params, value)
+                elif name == "RRULE":
+                    event["rrule"] = value.strip()
+                elif name == "RECURRENCE-ID":
+                    event["recurrence_id"] = ics_local(*parse_ics_datetime(params, value))
+                elif name == "EXDATE":
+                    event["exdates"].extend(ics_local(*parse_ics_datetime(params, v)) for v in value.split(","))
+            except ValueError:
+                event["invalid"] = f"unreadable {name}: {value}"
+
+def ics_occurrences(event, overrides, today=None):
+    """Return the (uid, local start) rows an event stands for. Recurring events
+    get one row per occurrence, keyed by UID plus the occurrence's original start,
+    minus EXDATEs and occurrences that a RECURRENCE-ID event replaces."""
+    if event.get("invalid"):
+        raise ValueError(event["invalid"])
+    if not event.get("title") or not event.get("start"):
+        raise ValueError("event has no SUMMARY or DTSTART")
+    uid, start, tz = event["uid"], event["start"], event["tz"]
+    if event.get("recurrence_id"):
+        if event.get("cancelled"):
+            return []
+        return [(f"{uid}#{ics_occurrence_key(event['recurrence_id'])}", ics_local(start, tz))]
+    if event.get("cancelled"):
+        return []
+    if not event.get("rrule"):
+        return [(uid, ics_local(start, tz))]
+    today = today or datetime.date.today()
+    first = start.date() if isinstance(start, datetime.datetime) else start
+    horizon = max(today, first) + datetime.timedelta(days=ICS_RECURRENCE_HORIZON_DAYS)
+    excluded = {ics_occurrence_key(local) for local in event["exdates"]}
+    rows = []
+    for occurrence in expand_rrule(start, tz, event["rrule"], horizon):
+        key = ics_occurrence_key(ics_local(occurrence, tz))
+        if key not in excluded and (uid, key) not in overrides:
+            rows.append((f"{uid}#{key}", ics_local(occurrence, tz)))
+    return rows
+
+def import_ics(path, user_id, progress=None, batch_size=ICS_BATCH_SIZE):
+    """Import the VEVENTs in path. Returns (processed, inserted, skipped):
+    occurrences read, occurrences new to the calendar, and events that could
+    not be imported (unreadable dates or recurrence rules)."""
+    total_bytes = max(os.path.getsize(path), 1)
+    processed = 0
+    inserted = 0
+    skipped = 0
+    with open(path, "rb") as f:
+        overrides = {(ev["uid"], ics_occurrence_key(ev["recurrence_id"]))
+                     for ev in iter_ics_events(f) if ev.get("recurrence_id") and ev.get("uid")}
+    conn = connect_db()
+    try:
+        with open(path, "rb") as f:
+            batch = []
+            for ev in iter_ics_events(f):
+                try:
+                    rows = ics_occurrences(ev, overrides)
+                except ValueError:
+                    skipped += 1
+                    continue
+                for uid, start in rows:
+                    minute = start.hour * 60 + start.minute if isinstance(start, datetime.datetime) else None
+                    batch.append((user_id, uid, ev["title"], to_day(start), minute))
+                if len(batch) >= batch_size:
+                    inserted += _insert_ics_batch(conn, batch)
+                    processed += len(batch)
+                    batch = []
+                    if progress:
+                        progress(processed, inserted, f.tell() / total_bytes)
+            if batch:
+                inserted += _insert_ics_batch(conn, batch)
+                processed += len(batch)
+        if progress:
+            progress(processed, inserted, 1.0)
+    finally:
+        conn.close()
+    return processed, inserted, skipped
+
+def _insert_ics_batch(conn, batch):
+    with conn:
+        return conn.executemany("INSERT OR IGNORE INTO events (user_id, uid, title, day, minute) VALUES (?,?,?,?,?)", batch).rowcount
+
+def export_ics(path, user_id):
+    conn = connect_db()
+    count = 0
+    try:
+        with conn:
+            conn.execute("UPDATE events SET uid = lower(hex(randomblob(16))) WHERE user_id=? AND uid IS NULL", (user_id,))
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//EduQuest//EduQuest Desktop//EN\r\n")
+            cur = conn.execute("SELECT uid, title, day, minute FROM events WHERE user_id=? AND title NOT LIKE '% — %' ORDER BY day, minute", (user_id,))
+            for uid, title, day, minute in cur:
+                day = from_day(day).strftime("%Y%m%d")
+                f.write("BEGIN:VEVENT\r\n")
+                f.write(ics_fold(f"UID:{uid}"))
+                f.write(f"DTSTAMP:{stamp}\r\n")
+                if minute is not None:
+                    f.write(f"DTSTART:{day}T{minute // 60:02d}{minute % 60:02d}00\r\n")
+                else:
+                    f.write(f"DTSTART;VALUE=DATE:{day}\r\n")
+                f.write(ics_fold(f"SUMMARY:{ics_escape(title)}"))
+                f.write("END:VEVENT\r\n")
+                count += 1
+            f.write("END:VCALENDAR\r\n")
+    finally:
+        conn.close()
+    return count
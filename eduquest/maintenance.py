@@ -0,0 +1,127 @@
+import os, sys, sqlite3, datetime, time
+
+from . import db
+from .db import connect_db
+from .perf import PERF
+from .sync import compact_change_log
+
+BACKUP_DIR = 'eduquest_backups'
+BACKUP_KEEP = 7
+VACUUM_PAGES_PER_RUN = 2000
+
+def init_maintenance():
+    conn = connect_db()
+    c = conn.cursor()
+    try:
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS maintenance_log (
+                task TEXT PRIMARY KEY,
+                last_ts INTEGER NOT NULL,
+                ok INTEGER NOT NULL,
+                detail TEXT
+            )
+        """)
+        conn.commit()
+        c.execute("PRAGMA journal_mode")
+        if c.fetchone()[0] != "wal":
+            print("MIGRATING DATABASE: Switching to write-ahead logging.", file=sys.stderr)
+            c.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+
+def optimize_database(conn):
+    conn.execute("PRAGMA analysis_limit=1000")
+    conn.execute("ANALYZE")
+    return "planner statistics refreshed"
+
+def vacuum_database(conn, pages=VACUUM_PAGES_PER_RUN):
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        return "enabled incremental vacuum with a full VACUUM"
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if free:
+        conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    return f"released {min(free, pages)} of {free} free pages"
+
+def check_database(conn):
+    problems = [row[0] for row in conn.execute("PRAGMA integrity_check(20)")]
+    if problems != ["ok"]:
+        raise sqlite3.DatabaseError("; ".join(problems))
+    return "ok"
+
+def compact_journal(conn):
+    return f"removed {compact_change_log(conn)} superseded change journal entries"
+
+def backup_dir():
+    """Backups live in BACKUP_DIR next to the database, whatever the working directory."""
+    return os.path.join(os.path.dirname(db.DB), BACKUP_DIR)
+
+def list_backups(dest_dir=None):
+    dest_dir = dest_dir or backup_dir()
+    prefix = os.path.splitext(os.path.basename(db.DB))[0] + "-"
+    if not os.path.isdir(dest_dir):
+        return []
+    return sorted(os.path.join(dest_dir, f) for f in os.listdir(dest_dir) if f.startswith(prefix) and f.endswith(".db"))
+
+def backup_database(conn, dest_dir=None, keep=BACKUP_KEEP):
+    dest_dir = dest_dir or backup_dir()
+    os.makedirs(dest_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(dest_dir, f"{os.path.splitext(os.path.basename(db.DB))[0]}-{stamp}.db")
+    partial = path + ".partial"
+    target = sqlite3.connect(partial)
+    try:
+        # One step reads a single WAL snapshot, so writers carry on; a stepped backup restarts on every foreign write.
+        conn.backup(target)
+        target.execute("PRAGMA journal_mode=DELETE")
+        if target.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            raise sqlite3.DatabaseError("backup copy failed its consistency check")
+        target.close()
+        os.replace(partial, path)
+    except BaseException:
+        target.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    for old in list_backups(dest_dir)[:-keep]:
+        os.remove(old)
+    return path
+
+MAINTENANCE_TASKS = {
+    "optimize": (86400, optimize_database),
+    "vacuum": (86400, vacuum_database),
+    "integrity": (7 * 86400, check_database),
+    "journal": (86400, compact_journal),
+    "backup": (86400, backup_database),
+}
+
+def due_maintenance(now=None):
+    now = time.time() if now is None else now
+    conn = connect_db()
+    try:
+        last = dict(conn.execute("SELECT task, last_ts FROM maintenance_log"))
+    finally:
+        conn.close()
+    return [task for task, (period, _) in MAINTENANCE_TASKS.items() if now - last.get(task, 0) >= period]
+
+def run_maintenance(tasks, stop=None):
+    results = {}
+    conn = connect_db()
+    try:
+        for task in tasks:
+            if stop is not None and stop():
+                break
+            try:
+                with PERF.span(f"maintenance:{task}"):
+                    detail = MAINTENANCE_TASKS[task][1](conn)
+                ok = True
+            except (sqlite3.Error, OSError) as e:
+                ok, detail = False, str(e)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO maintenance_log (task, last_ts, ok, detail) VALUES (?,?,?,?)",
+                             (task, int(time.time()), int(ok), detail))
+            results[task] = (ok, detail)
+    finally:
+        conn.close()
+    return results
@@ -0,0 +1,151 @@
+import os, sys, json, time, zlib, datetime
+
+from .db import connect_db, user_notes_dir
+from .sync import journal_note
+
+NOTE_SNAPSHOT_EVERY = 10
+NOTE_REVISION_RETENTION = 50
+
+def read_note_title(fpath):
+    with open(fpath, "r", encoding="utf-8") as f:
+        return f.readline().strip()
+
+
+def list_notes(user_id):
+    notes = {}
+    notes_dir = user_notes_dir(user_id)
+    for fname in os.listdir(notes_dir):
+        if fname.endswith(".txt"):
+            fpath = os.path.join(notes_dir, fname)
+            try:
+                notes[read_note_title(fpath) or fname] = fpath
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error loading note {fname}: {e}", file=sys.stderr)
+    return notes
+
+def save_note(user_id, title, body, fpath=None, record=None):
+    if not fpath or not os.path.exists(fpath):
+        stamp = int(datetime.datetime.now().timestamp())
+        while os.path.exists(fpath := os.path.join(user_notes_dir(user_id), f"note_{stamp}.txt")):
+            stamp += 1
+    content = title + "\n\n" + body
+    with open(fpath, "w", encoding="utf-8") as f:
+        f.write(content)
+    (record or record_note_revision)(user_id, os.path.basename(fpath), content)
+    journal_note(user_id, os.path.basename(fpath), content)
+    return fpath
+
+def delete_note(user_id, fpath, forget=None):
+    os.remove(fpath)
+    (forget or delete_note_revisions)(user_id, os.path.basename(fpath))
+    journal_note(user_id, os.path.basename(fpath), None)
+
+def encode_note_delta(old, new):
+    # Greedy line matching: one pass over each version, so saving cost stays linear in the note size.
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    first = dict(zip(reversed(a), range(len(a) - 1, -1, -1)))
+    ops = []
+    literal = []
+    start = end = 0
+    for line in b:
+        pos = end if end < len(a) and a[end] == line else first.get(line)
+        if pos is None:
+            if end > start:
+                ops.append([start, end])
+                start = end
+            literal.append(line)
+        elif pos == end and end > start:
+            end += 1
+        else:
+            if end > start:
+                ops.append([start, end])
+            if literal:
+                ops.append("".join(literal))
+                literal = []
+            start, end = pos, pos + 1
+    if end > start:
+        ops.append([start, end])
+    if literal:
+        ops.append("".join(literal))
+    return zlib.compress(json.dumps(ops).encode("utf-8"))
+
+def apply_note_delta(old, data):
+    a = old.splitlines(keepends=True)
+    out = []
+    for op in json.loads(zlib.decompress(data).decode("utf-8")):
+        if isinstance(op, str):
+            out.append(op)
+        else:
+            out.extend(a[op[0]:op[1]])
+    return "".join(out)
+
+def _note_revision_text(c, user_id, note, rev):
+    c.execute("SELECT MAX(rev) FROM note_revisions WHERE user_id=? AND note=? AND kind='full' AND rev<=?", (user_id, note, rev))
+    base = c.fetchone()[0]
+    if base is None:
+        return None
+    text = None
+    c.execute("SELECT kind, data FROM note_revisions WHERE user_id=? AND note=? AND rev BETWEEN ? AND ? ORDER BY rev", (user_id, note, base, rev))
+    for kind, data in c.fetchall():
+        text = zlib.decompress(data).decode("utf-8") if kind == "full" else apply_note_delta(text, data)
+    return text
+
+def load_note_revision(user_id, note, rev):
+    conn = connect_db()
+    try:
+        return _note_revision_text(conn.cursor(), user_id, note, rev)
+    finally:
+        conn.close()
+
+def list_note_revisions(user_id, note):
+    conn = connect_db()
+    try:
+        return conn.execute("SELECT rev, created_ts, size, kind FROM note_revisions WHERE user_id=? AND note=? ORDER BY rev DESC", (user_id, note)).fetchall()
+    finally:
+        conn.close()
+
+def record_note_revision(user_id, note, text, retention=NOTE_REVISION_RETENTION, snapshot_every=NOTE_SNAPSHOT_EVERY):
+    conn = connect_db()
+    c = conn.cursor()
+    try:
+        c.execute("SELECT MAX(rev) FROM note_revisions WHERE user_id=? AND note=?", (user_id, note))
+        latest = c.fetchone()[0]
+        previous = _note_revision_text(c, user_id, note, latest) if latest is not None else None
+        if previous == text:
+            return latest
+        rev = 1 if latest is None else latest + 1
+        c.execute("SELECT MAX(rev) FROM note_revisions WHERE user_id=? AND note=? AND kind='full'", (user_id, note))
+        last_full = c.fetchone()[0]
+        if previous is None or last_full is None or rev - last_full >= snapshot_every:
+            kind, data = "full", zlib.compress(text.encode("utf-8"))
+        else:
+            kind, data = "delta", encode_note_delta(previous, text)
+        with conn:
+            c.execute("INSERT INTO note_revisions (user_id, note, rev, kind, data, size, created_ts) VALUES (?,?,?,?,?,?,?)",
+                      (user_id, note, rev, kind, data, len(text), int(time.time())))
+            _compact_note_revisions(c, user_id, note, retention)
+        return rev
+    finally:
+        conn.close()
+
+def _compact_note_revisions(c, user_id, note, retention):
+    c.execute("SELECT rev FROM note_revisions WHERE user_id=? AND note=? ORDER BY rev DESC LIMIT 1 OFFSET ?", (user_id, note, retention - 1))
+    row = c.fetchone()
+    if row is None:
+        return
+    oldest = row[0]
+    c.execute("SELECT kind FROM note_revisions WHERE user_id=? AND note=? AND rev=?", (user_id, note, oldest))
+    if c.fetchone()[0] != "full":
+        text = _note_revision_text(c, user_id, note, oldest)
+        c.execute("UPDATE note_revisions SET kind='full', data=? WHERE user_id=? AND note=? AND rev=?",
+                  (zlib.compress(text.encode("utf-8")), user_id, note, oldest))
+    c.execute("DELETE FROM note_revisions WHERE user_id=? AND note=? AND rev<?", (user_id, note, oldest))
+
+def delete_note_revisions(user_id, note):
+    conn = connect_db()
+    try:
+        with conn:
+            conn.execute("DELETE FROM note_revisions WHERE user_id=? AND note=?", (user_id, note))
+    finally:
+        conn.close()
@@ -0,0 +1,107 @@
+import sqlite3, datetime, json, time, contextlib, threading
+from collections import deque
+from time import perf_counter
+
+PERF_BUFFER_SIZE = 2000
+PERF_DUMP_FILE = 'eduquest_perf.json'
+
+class PerfRecorder:
+    def __init__(self, size=PERF_BUFFER_SIZE):
+        self.enabled = False
+        self.samples = deque(maxlen=size)
+        self.counters = {}
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        for listener in self.listeners:
+            listener(enabled)
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return PerfSpan(self, name)
+
+    def record(self, name, seconds):
+        if self.enabled:
+            with self.lock:
+                self.samples.append((time.time(), name, seconds))
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """Copy samples and counters so readers never iterate while worker threads record."""
+        with self.lock:
+            return list(self.samples), dict(self.counters)
+
+    def summary(self, samples=None):
+        if samples is None:
+            samples = self.snapshot()[0]
+        stats = {}
+        for _, name, seconds in samples:
+            s = stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += 1
+            s["total_ms"] += seconds * 1000
+            s["max_ms"] = max(s["max_ms"], seconds * 1000)
+        for s in stats.values():
+            s["mean_ms"] = s["total_ms"] / s["count"]
+        return stats
+
+    def dump(self, path=PERF_DUMP_FILE):
+        samples, counters = self.snapshot()
+        data = {
+            "generated": datetime.datetime.now().isoformat(),
+            "summary": self.summary(samples),
+            "counters": counters,
+            "samples": [{"at": at, "name": name, "ms": seconds * 1000} for at, name, seconds in samples],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        return path
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counters.clear()
+
+
+class PerfSpan:
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, perf_counter() - self.start)
+        return False
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        with PERF.span(f"sql:{' '.join(sql.split())[:80]}"):
+            return super().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        with PERF.span(f"sql:{' '.join(sql.split())[:80]}"):
+            return super().executemany(sql, seq)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+
+NULL_SPAN = contextlib.nullcontext()
+PERF = PerfRecorder()
@@ -0,0 +1,252 @@
+import os, sys, shutil, sqlite3, datetime
+
+from . import db
+from .db import connect_db, table_columns, user_notes_dir
+from .users import DEMO_USER, _insert_user, _expire_demo_password
+from .sessions import recover_open_sessions
+from .sync import init_sync
+from .events import init_search
+from .maintenance import init_maintenance
+
+SCHEMA_VERSION = 5
+
+def init_db():
+    conn = connect_db()
+    c = conn.cursor()
+    if "date" in table_columns(c, "events") or "start_time" in table_columns(c, "study_sessions"):
+        backup_before_migration(conn)
+    c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            salt BLOB NOT NULL,
+            pw_hash BLOB NOT NULL,
+            iterations INTEGER NOT NULL,
+            created TEXT NOT NULL,
+            must_change_password INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    if "must_change_password" not in table_columns(c, "users"):
+        print("MIGRATING DATABASE: Adding 'must_change_password' column to users table.", file=sys.stderr)
+        c.execute("ALTER TABLE users ADD COLUMN must_change_password INTEGER NOT NULL DEFAULT 0")
+        _expire_demo_password(c)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            user_id INTEGER REFERENCES users(id),
+            uid TEXT,
+            title TEXT NOT NULL, 
+            day INTEGER NOT NULL, 
+            minute INTEGER 
+        )
+    """)
+    
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS study_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            user_id INTEGER REFERENCES users(id),
+            uid TEXT,
+            type TEXT NOT NULL, 
+            start_ts INTEGER NOT NULL, 
+            end_ts INTEGER NOT NULL,
+            duration_seconds INTEGER NOT NULL,
+            is_open INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS note_revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users(id),
+            note TEXT NOT NULL,
+            rev INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_ts INTEGER NOT NULL,
+            UNIQUE (user_id, note, rev)
+        )
+    """)
+    
+    conn.commit()
+
+    event_columns = table_columns(c, "events")
+    if "date" in event_columns:
+        for name, decl in (("time", "TEXT"), ("uid", "TEXT"), ("user_id", "INTEGER REFERENCES users(id)")):
+            if name not in event_columns:
+                print(f"MIGRATING DATABASE: Adding '{name}' column to events table.", file=sys.stderr)
+                c.execute(f"ALTER TABLE events ADD COLUMN {name} {decl}")
+        conn.commit()
+
+    session_columns = table_columns(c, "study_sessions")
+    if "user_id" not in session_columns:
+        print("MIGRATING DATABASE: Adding 'user_id' column to study_sessions table.", file=sys.stderr)
+        c.execute("ALTER TABLE study_sessions ADD COLUMN user_id INTEGER REFERENCES users(id)")
+        conn.commit()
+
+    legacy_notes = []
+    if os.path.isdir(db.NOTES_DIR):
+        legacy_notes = [fname for fname in os.listdir(db.NOTES_DIR)
+                        if fname.endswith(".txt") and os.path.isfile(os.path.join(db.NOTES_DIR, fname))]
+    c.execute("SELECT EXISTS (SELECT 1 FROM events WHERE user_id IS NULL) OR EXISTS (SELECT 1 FROM study_sessions WHERE user_id IS NULL)")
+    demo_id = None
+    if c.fetchone()[0] or legacy_notes:
+        # Data from before accounts existed goes to 'demo', whose well-known password must be changed on first login.
+        c.execute("SELECT id FROM users WHERE username=?", (DEMO_USER[0],))
+        row = c.fetchone()
+        if row:
+            demo_id = row[0]
+        else:
+            print("MIGRATING DATABASE: Moving single-user data to the 'demo' account.", file=sys.stderr)
+            demo_id = _insert_user(c, *DEMO_USER, must_change_password=True)
+        c.execute("UPDATE events SET user_id=? WHERE user_id IS NULL", (demo_id,))
+        c.execute("UPDATE study_sessions SET user_id=? WHERE user_id IS NULL", (demo_id,))
+        conn.commit()
+
+    if "date" in event_columns:
+        migrate_events_to_typed(c)
+    if "start_time" in session_columns:
+        migrate_sessions_to_typed(c)
+    if "uid" not in table_columns(c, "study_sessions"):
+        print("MIGRATING DATABASE: Adding 'uid' column to study_sessions table.", file=sys.stderr)
+        c.execute("ALTER TABLE study_sessions ADD COLUMN uid TEXT")
+    if "is_open" not in table_columns(c, "study_sessions"):
+        print("MIGRATING DATABASE: Adding 'is_open' column to study_sessions table.", file=sys.stderr)
+        c.execute("ALTER TABLE study_sessions ADD COLUMN is_open INTEGER NOT NULL DEFAULT 0")
+    c.execute("UPDATE events SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL")
+    c.execute("UPDATE study_sessions SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL")
+    conn.commit()
+
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_events_user_uid ON events(user_id, uid)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_user_day ON events(user_id, day, minute)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_start ON study_sessions(user_id, start_ts)")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_user_uid ON study_sessions(user_id, uid)")
+    conn.commit()
+
+    recovered = recover_open_sessions(c)
+    if recovered:
+        print(f"Recovered {recovered} unfinished study sessions from the last run.", file=sys.stderr)
+    c.execute("""
+        CREATE VIEW IF NOT EXISTS events_text AS
+        SELECT id, user_id, uid, title,
+               date(day * 86400, 'unixepoch') AS date,
+               CASE WHEN minute IS NULL THEN NULL ELSE printf('%02d:%02d', minute / 60, minute % 60) END AS time
+        FROM events
+    """)
+    c.execute("""
+        CREATE VIEW IF NOT EXISTS study_sessions_text AS
+        SELECT id, user_id, type,
+               datetime(start_ts, 'unixepoch', 'localtime') AS start_time,
+               datetime(end_ts, 'unixepoch', 'localtime') AS end_time,
+               duration_seconds
+        FROM study_sessions
+    """)
+    conn.commit()
+    
+    conn.close()
+    if not os.path.exists(db.NOTES_DIR):
+        os.makedirs(db.NOTES_DIR)
+
+    if legacy_notes:
+        demo_dir = user_notes_dir(demo_id)
+        for fname in legacy_notes:
+            print(f"MIGRATING NOTES: Moving {fname} to {demo_dir}.", file=sys.stderr)
+            shutil.move(os.path.join(db.NOTES_DIR, fname), os.path.join(demo_dir, fname))
+
+    init_sync()
+    init_search()
+    init_maintenance()
+
+    conn = connect_db()
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    conn.close()
+
+def ensure_db():
+    if os.path.exists(db.DB):
+        conn = connect_db()
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                return False
+        finally:
+            conn.close()
+    init_db()
+    return True
+
+def backup_before_migration(conn):
+    """Copy the database next to itself before the typed-column migrations rebuild its tables."""
+    root, ext = os.path.splitext(db.DB)
+    path = f"{root}-pre-migration-{datetime.datetime.now():%Y%m%d-%H%M%S}{ext or '.db'}"
+    target = sqlite3.connect(path)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+    print(f"MIGRATING DATABASE: Saved a copy of the old database as {path}.", file=sys.stderr)
+    return path
+
+def keep_unmigrated_rows(c, table, where):
+    """Move rows the typed rebuild cannot read into <table>_unmigrated instead of dropping them."""
+    c.execute(f"CREATE TABLE IF NOT EXISTS {table}_unmigrated AS SELECT * FROM {table} WHERE 0")
+    kept = c.execute(f"INSERT INTO {table}_unmigrated SELECT * FROM {table} WHERE {where}").rowcount
+    if kept:
+        print(f"MIGRATING DATABASE: Kept {kept} unreadable {table} rows in {table}_unmigrated.", file=sys.stderr)
+    return kept
+
+def migrate_events_to_typed(c):
+    print("MIGRATING DATABASE: Converting events date/time to integer day/minute columns.", file=sys.stderr)
+    c.execute("DROP TABLE IF EXISTS events_typed")
+    c.execute("""
+        CREATE TABLE events_typed (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            user_id INTEGER REFERENCES users(id),
+            uid TEXT,
+            title TEXT NOT NULL, 
+            day INTEGER NOT NULL, 
+            minute INTEGER 
+        )
+    """)
+    c.execute("""
+        INSERT INTO events_typed (id, user_id, uid, title, day, minute)
+        SELECT id, user_id, uid, title,
+               CAST(julianday(date) - 2440587.5 AS INTEGER),
+               CASE WHEN time GLOB '[0-9][0-9]:[0-9][0-9]*'
+                    THEN CAST(substr(time, 1, 2) AS INTEGER) * 60 + CAST(substr(time, 4, 2) AS INTEGER) END
+        FROM events WHERE julianday(date) IS NOT NULL
+    """)
+    print(f"MIGRATING DATABASE: Converted {c.rowcount} events.", file=sys.stderr)
+    keep_unmigrated_rows(c, "events", "julianday(date) IS NULL")
+    c.execute("DROP TABLE events")
+    c.execute("ALTER TABLE events_typed RENAME TO events")
+    c.connection.commit()
+
+def migrate_sessions_to_typed(c):
+    print("MIGRATING DATABASE: Converting study_sessions timestamps to integer epoch columns.", file=sys.stderr)
+    c.execute("DROP TABLE IF EXISTS study_sessions_typed")
+    c.execute("""
+        CREATE TABLE study_sessions_typed (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, 
+            user_id INTEGER REFERENCES users(id),
+            uid TEXT,
+            type TEXT NOT NULL, 
+            start_ts INTEGER NOT NULL, 
+            end_ts INTEGER NOT NULL,
+            duration_seconds INTEGER NOT NULL
+        )
+    """)
+    c.execute("""
+        INSERT INTO study_sessions_typed (id, user_id, type, start_ts, end_ts, duration_seconds)
+        SELECT id, user_id, type,
+               CAST(strftime('%s', start_time, 'utc') AS INTEGER),
+               CAST(strftime('%s', end_time, 'utc') AS INTEGER),
+               duration_seconds
+        FROM study_sessions
+        WHERE strftime('%s', start_time) IS NOT NULL AND strftime('%s', end_time) IS NOT NULL
+    """)
+    print(f"MIGRATING DATABASE: Converted {c.rowcount} study sessions.", file=sys.stderr)
+    keep_unmigrated_rows(c, "study_sessions", "strftime('%s', start_time) IS NULL OR strftime('%s', end_time) IS NULL")
+    c.execute("DROP TABLE study_sessions")
+    c.execute("ALTER TABLE study_sessions_typed RENAME TO study_sessions")
+    c.connection.commit()
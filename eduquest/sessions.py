@@ -0,0 +1,96 @@
+import datetime
+from collections import namedtuple
+
+from .db import connect_db, new_uid
+
+SESSION_MIN_SECONDS = 5
+
+class StudySessionRow(namedtuple("StudySessionRow", "type start_ts end_ts duration_seconds")):
+    __slots__ = ()
+
+    @property
+    def start(self):
+        return datetime.datetime.fromtimestamp(self.start_ts)
+
+    @property
+    def end(self):
+        return datetime.datetime.fromtimestamp(self.end_ts)
+
+
+def open_session_segment(user_id, kind, at):
+    conn = connect_db()
+    try:
+        with conn:
+            return conn.execute("INSERT INTO study_sessions (user_id, uid, type, start_ts, end_ts, duration_seconds, is_open) VALUES (?,?,?,?,?,0,1)",
+                                (user_id, new_uid(), kind, int(at), int(at))).lastrowid
+    finally:
+        conn.close()
+
+def checkpoint_session_segments(segments, now):
+    conn = connect_db()
+    try:
+        with conn:
+            conn.executemany("UPDATE study_sessions SET end_ts=?, duration_seconds=? WHERE id=?",
+                             ((int(now), int(now - start), row_id) for row_id, start in segments))
+    finally:
+        conn.close()
+
+def close_session_segment(row_id, start, at):
+    duration = int(max(at - start, 0))
+    conn = connect_db()
+    try:
+        with conn:
+            if duration > SESSION_MIN_SECONDS:
+                conn.execute("UPDATE study_sessions SET end_ts=?, duration_seconds=?, is_open=0 WHERE id=?",
+                             (int(at), duration, row_id))
+                return duration
+            conn.execute("DELETE FROM study_sessions WHERE id=?", (row_id,))
+            return 0
+    finally:
+        conn.close()
+
+def recover_open_sessions(c):
+    c.execute("DELETE FROM study_sessions WHERE is_open=1 AND duration_seconds<=?", (SESSION_MIN_SECONDS,))
+    c.execute("UPDATE study_sessions SET is_open=0 WHERE is_open=1")
+    return c.rowcount
+
+def list_sessions(user_id, limit=-1):
+    conn = connect_db()
+    try:
+        rows = conn.execute("SELECT type, start_ts, end_ts, duration_seconds FROM study_sessions WHERE user_id=? ORDER BY start_ts DESC LIMIT ?",
+                            (user_id, limit)).fetchall()
+    finally:
+        conn.close()
+    return [StudySessionRow._make(row) for row in rows]
+
+def total_study_seconds(user_id):
+    conn = connect_db()
+    try:
+        return conn.execute("SELECT SUM(duration_seconds) FROM study_sessions WHERE user_id=?", (user_id,)).fetchone()[0] or 0
+    finally:
+        conn.close()
+
+def study_totals(user_id, start_ts, end_ts):
+    conn = connect_db()
+    try:
+        rows = conn.execute("""
+            SELECT type, COUNT(*), SUM(duration_seconds) FROM study_sessions
+            WHERE user_id=? AND start_ts >= ? AND start_ts < ? GROUP BY type ORDER BY SUM(duration_seconds) DESC
+        """, (user_id, int(start_ts), int(end_ts))).fetchall()
+    finally:
+        conn.close()
+    return {kind: (count, seconds) for kind, count, seconds in rows}
+
+def format_seconds(total_seconds):
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    seconds = total_seconds % 60
+
+    parts = []
+    if hours > 0:
+        parts.append(f"{hours}h")
+    if minutes > 0:
+        parts.append(f"{minutes}m")
+    parts.append(f"{seconds}s")
+
+    return " ".join(parts)
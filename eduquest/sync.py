@@ -0,0 +1,252 @@
+import os, sys, json, gzip, hashlib
+
+from .db import connect_db, user_notes_dir, new_uid
+
+SYNC_FORMAT = 'eduquest-sync'
+SYNC_VERSION = 1
+SYNC_TABLES = {
+    "event": ("events", ("title", "day", "minute")),
+    "session": ("study_sessions", ("type", "start_ts", "end_ts", "duration_seconds")),
+}
+SYNC_UNFINISHED = {"study_sessions": "is_open"}
+
+def _note_ref(content):
+    return json.dumps({"sha1": hashlib.sha1(content.encode("utf-8")).hexdigest(), "size": len(content)})
+
+def init_sync():
+    conn = connect_db()
+    c = conn.cursor()
+    c.execute("CREATE TABLE IF NOT EXISTS sync_meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            entity TEXT NOT NULL,
+            uid TEXT NOT NULL,
+            op TEXT NOT NULL,
+            clock INTEGER NOT NULL,
+            origin TEXT NOT NULL,
+            payload TEXT
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sync_versions (
+            user_id INTEGER NOT NULL,
+            entity TEXT NOT NULL,
+            uid TEXT NOT NULL,
+            clock INTEGER NOT NULL,
+            origin TEXT NOT NULL,
+            PRIMARY KEY (user_id, entity, uid)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            user_id INTEGER NOT NULL,
+            peer TEXT NOT NULL,
+            sent_seq INTEGER NOT NULL,
+            PRIMARY KEY (user_id, peer)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_change_log_user_seq ON change_log(user_id, seq)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_change_log_user_key ON change_log(user_id, entity, uid, seq)")
+
+    c.execute("SELECT value FROM sync_meta WHERE key='install_id'")
+    if c.fetchone() is None:
+        print("MIGRATING DATABASE: Seeding the sync change journal.", file=sys.stderr)
+        origin = new_uid()
+        c.execute("INSERT INTO sync_meta (key, value) VALUES ('install_id', ?), ('clock', '1')", (origin,))
+        for entity, (table, fields) in SYNC_TABLES.items():
+            payload = ", ".join(f"'{f}', {f}" for f in fields)
+            finished = f"WHERE {SYNC_UNFINISHED[table]} = 0" if table in SYNC_UNFINISHED else ""
+            c.execute(f"""
+                INSERT INTO change_log (user_id, entity, uid, op, clock, origin, payload)
+                SELECT user_id, '{entity}', uid, 'upsert', 1, ?, json_object({payload}) FROM {table} {finished}
+            """, (origin,))
+        c.execute("SELECT id FROM users")
+        for (user_id,) in c.fetchall():
+            notes_dir = user_notes_dir(user_id)
+            for fname in os.listdir(notes_dir):
+                if fname.endswith(".txt"):
+                    with open(os.path.join(notes_dir, fname), "r", encoding="utf-8") as f:
+                        content = f.read()
+                    c.execute("INSERT INTO change_log (user_id, entity, uid, op, clock, origin, payload) VALUES (?, 'note', ?, 'upsert', 1, ?, ?)",
+                              (user_id, fname, origin, _note_ref(content)))
+        c.execute("INSERT OR REPLACE INTO sync_versions SELECT user_id, entity, uid, clock, origin FROM change_log")
+
+    c.execute("SELECT value FROM sync_meta WHERE key='note_refs'")
+    if c.fetchone() is None:
+        c.execute("SELECT seq, payload FROM change_log WHERE entity='note' AND json_extract(payload, '$.content') IS NOT NULL")
+        rows = c.fetchall()
+        if rows:
+            print("MIGRATING DATABASE: Replacing note bodies in the change journal with content hashes.", file=sys.stderr)
+            c.executemany("UPDATE change_log SET payload=? WHERE seq=?", ((_note_ref(json.loads(payload)["content"]), seq) for seq, payload in rows))
+        c.execute("INSERT INTO sync_meta (key, value) VALUES ('note_refs', '1')")
+        compact_change_log(conn)
+
+    for entity, (table, fields) in SYNC_TABLES.items():
+        payload = ", ".join(f"'{f}', NEW.{f}" for f in fields)
+        flag = SYNC_UNFINISHED.get(table)
+        columns = ", ".join(("uid", *fields, flag) if flag else ("uid", *fields))
+        for event, row, op, body in (("INSERT", "NEW", "upsert", f"json_object({payload})"),
+                                     (f"UPDATE OF {columns}", "NEW", "upsert", f"json_object({payload})"),
+                                     ("DELETE", "OLD", "delete", "NULL")):
+            name = f"sync_{table}_{event.split()[0].lower()}"
+            # Rows still being written (open study sessions) are journaled once, when they are finished.
+            finished = f" AND {row}.{flag} = 0" if flag else ""
+            c.execute(f"DROP TRIGGER IF EXISTS {name}")
+            c.execute(f"""
+                CREATE TRIGGER {name} AFTER {event} ON {table}
+                WHEN {row}.uid IS NOT NULL{finished} AND NOT EXISTS (SELECT 1 FROM sync_meta WHERE key='applying')
+                BEGIN
+                    UPDATE sync_meta SET value = CAST(value AS INTEGER) + 1 WHERE key='clock';
+                    INSERT INTO change_log (user_id, entity, uid, op, clock, origin, payload)
+                    VALUES ({row}.user_id, '{entity}', {row}.uid, '{op}',
+                            (SELECT CAST(value AS INTEGER) FROM sync_meta WHERE key='clock'),
+                            (SELECT value FROM sync_meta WHERE key='install_id'), {body});
+                    INSERT OR REPLACE INTO sync_versions (user_id, entity, uid, clock, origin)
+                    SELECT user_id, entity, uid, clock, origin FROM change_log WHERE seq = last_insert_rowid();
+                END
+            """)
+    conn.commit()
+    conn.close()
+
+def journal_note(user_id, note, content):
+    conn = connect_db()
+    c = conn.cursor()
+    try:
+        with conn:
+            c.execute("UPDATE sync_meta SET value = CAST(value AS INTEGER) + 1 WHERE key='clock'")
+            c.execute("SELECT CAST(value AS INTEGER) FROM sync_meta WHERE key='clock'")
+            clock = c.fetchone()[0]
+            c.execute("SELECT value FROM sync_meta WHERE key='install_id'")
+            origin = c.fetchone()[0]
+            op, payload = ("delete", None) if content is None else ("upsert", _note_ref(content))
+            c.execute("INSERT INTO change_log (user_id, entity, uid, op, clock, origin, payload) VALUES (?, 'note', ?, ?, ?, ?, ?)",
+                      (user_id, note, op, clock, origin, payload))
+            c.execute("INSERT OR REPLACE INTO sync_versions (user_id, entity, uid, clock, origin) VALUES (?, 'note', ?, ?, ?)",
+                      (user_id, note, clock, origin))
+    finally:
+        conn.close()
+
+def compact_change_log(conn, user_id=None):
+    if user_id is None:
+        users = [row[0] for row in conn.execute("SELECT id FROM users")]
+    else:
+        users = [user_id]
+    removed = 0
+    with conn:
+        for uid in users:
+            # Only the latest entry per item is ever exported; older ones go once every known peer has been sent it.
+            horizon = conn.execute("SELECT COALESCE((SELECT MIN(sent_seq) FROM sync_peers WHERE user_id=?), (SELECT MAX(seq) FROM change_log))",
+                                   (uid,)).fetchone()[0]
+            removed += conn.execute("""
+                DELETE FROM change_log WHERE seq IN (
+                    SELECT c.seq FROM change_log c
+                    JOIN (SELECT entity, uid, MAX(seq) AS latest FROM change_log WHERE user_id=? GROUP BY entity, uid) l
+                      ON c.entity = l.entity AND c.uid = l.uid
+                    WHERE c.user_id=? AND c.seq < l.latest AND l.latest <= ?
+                )
+            """, (uid, uid, horizon or 0)).rowcount
+    return removed
+
+def export_sync_bundle(path, user_id, username, peer="default", full=False):
+    conn = connect_db()
+    c = conn.cursor()
+    try:
+        since = 0
+        if not full:
+            c.execute("SELECT sent_seq FROM sync_peers WHERE user_id=? AND peer=?", (user_id, peer))
+            row = c.fetchone()
+            since = row[0] if row else 0
+        c.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log WHERE user_id=?", (user_id,))
+        upto = c.fetchone()[0]
+        c.execute("SELECT value FROM sync_meta WHERE key='install_id'")
+        origin = c.fetchone()[0]
+        count = 0
+        notes_dir = user_notes_dir(user_id)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            header = {"format": SYNC_FORMAT, "version": SYNC_VERSION, "origin": origin, "username": username,
+                      "from_seq": since, "to_seq": upto}
+            f.write(json.dumps(header) + "\n")
+            cur = conn.execute("""
+                SELECT entity, uid, op, clock, origin, payload FROM change_log
+                WHERE seq IN (SELECT MAX(seq) FROM change_log WHERE user_id=? AND seq>? AND seq<=? GROUP BY entity, uid)
+                ORDER BY seq
+            """, (user_id, since, upto))
+            for entity, uid, op, clock, ch_origin, payload in cur:
+                payload = json.loads(payload) if payload else None
+                if entity == "note" and op == "upsert":
+                    try:
+                        with open(os.path.join(notes_dir, uid), "r", encoding="utf-8") as note:
+                            payload = {"content": note.read()}
+                    except FileNotFoundError:
+                        continue
+                f.write(json.dumps([entity, uid, op, clock, ch_origin, payload]) + "\n")
+                count += 1
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO sync_peers (user_id, peer, sent_seq) VALUES (?,?,?)", (user_id, peer, upto))
+        compact_change_log(conn, user_id)
+        return count
+    finally:
+        conn.close()
+
+def import_sync_bundle(path, user_id):
+    applied = 0
+    skipped = 0
+    note_writes = []
+    conn = connect_db()
+    c = conn.cursor()
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f, conn:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != SYNC_FORMAT or header.get("version") != SYNC_VERSION:
+                raise ValueError("Not an EduQuest sync bundle.")
+            c.execute("INSERT OR REPLACE INTO sync_meta (key, value) VALUES ('applying', '1')")
+            max_clock = 0
+            for line in f:
+                entity, uid, op, clock, origin, payload = json.loads(line)
+                max_clock = max(max_clock, clock)
+                c.execute("SELECT clock, origin FROM sync_versions WHERE user_id=? AND entity=? AND uid=?", (user_id, entity, uid))
+                current = c.fetchone()
+                if current is not None and tuple(current) >= (clock, origin):
+                    skipped += 1
+                    continue
+                if entity == "note":
+                    if os.path.basename(uid) != uid or not uid.endswith(".txt"):
+                        skipped += 1
+                        continue
+                    note_writes.append((uid, payload["content"] if op == "upsert" else None))
+                elif entity in SYNC_TABLES:
+                    table, fields = SYNC_TABLES[entity]
+                    if op == "upsert":
+                        c.execute(f"""
+                            INSERT INTO {table} (user_id, uid, {', '.join(fields)}) VALUES (?, ?, {', '.join('?' * len(fields))})
+                            ON CONFLICT(user_id, uid) DO UPDATE SET {', '.join(f'{f}=excluded.{f}' for f in fields)}
+                        """, (user_id, uid, *(payload[f] for f in fields)))
+                    else:
+                        c.execute(f"DELETE FROM {table} WHERE user_id=? AND uid=?", (user_id, uid))
+                else:
+                    skipped += 1
+                    continue
+                if payload is not None:
+                    payload = _note_ref(payload["content"]) if entity == "note" else json.dumps(payload)
+                c.execute("INSERT INTO change_log (user_id, entity, uid, op, clock, origin, payload) VALUES (?,?,?,?,?,?,?)",
+                          (user_id, entity, uid, op, clock, origin, payload))
+                c.execute("INSERT OR REPLACE INTO sync_versions (user_id, entity, uid, clock, origin) VALUES (?,?,?,?,?)",
+                          (user_id, entity, uid, clock, origin))
+                applied += 1
+            c.execute("UPDATE sync_meta SET value = MAX(CAST(value AS INTEGER), ?) WHERE key='clock'", (max_clock,))
+            c.execute("DELETE FROM sync_meta WHERE key='applying'")
+    finally:
+        conn.close()
+
+    notes_dir = user_notes_dir(user_id)
+    for note, content in note_writes:
+        fpath = os.path.join(notes_dir, note)
+        if content is None:
+            if os.path.exists(fpath):
+                os.remove(fpath)
+        else:
+            with open(fpath, "w", encoding="utf-8") as f:
+                f.write(content)
+    return applied, skipped
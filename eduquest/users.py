@@ -0,0 +1,71 @@
+import os, sqlite3, datetime, hashlib, hmac
+
+from .db import connect_db
+
+PBKDF2_ITERATIONS = 200000
+DEMO_USER = ('demo', 'eduquest')
+
+def hash_password(password, salt, iterations=PBKDF2_ITERATIONS):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+def _insert_user(c, username, password, must_change_password=False):
+    salt = os.urandom(16)
+    c.execute("INSERT INTO users (username, salt, pw_hash, iterations, created, must_change_password) VALUES (?,?,?,?,?,?)",
+              (username, salt, hash_password(password, salt), PBKDF2_ITERATIONS, datetime.datetime.now().isoformat(), int(must_change_password)))
+    return c.lastrowid
+
+def _expire_demo_password(c):
+    c.execute("SELECT id, salt, pw_hash, iterations FROM users WHERE username=?", (DEMO_USER[0],))
+    row = c.fetchone()
+    if row and hmac.compare_digest(hash_password(DEMO_USER[1], row[1], row[3]), row[2]):
+        c.execute("UPDATE users SET must_change_password=1 WHERE id=?", (row[0],))
+
+def create_user(username, password):
+    conn = connect_db()
+    try:
+        with conn:
+            return _insert_user(conn.cursor(), username, password)
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Username '{username}' is already taken.")
+    finally:
+        conn.close()
+
+def find_user(username):
+    conn = connect_db()
+    try:
+        row = conn.execute("SELECT id FROM users WHERE username=?", (username,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+def password_change_required(user_id):
+    conn = connect_db()
+    try:
+        row = conn.execute("SELECT must_change_password FROM users WHERE id=?", (user_id,)).fetchone()
+    finally:
+        conn.close()
+    return bool(row and row[0])
+
+def change_password(user_id, password):
+    salt = os.urandom(16)
+    conn = connect_db()
+    try:
+        with conn:
+            conn.execute("UPDATE users SET salt=?, pw_hash=?, iterations=?, must_change_password=0 WHERE id=?",
+                         (salt, hash_password(password, salt), PBKDF2_ITERATIONS, user_id))
+    finally:
+        conn.close()
+
+def authenticate(username, password):
+    conn = connect_db()
+    c = conn.cursor()
+    c.execute("SELECT id, salt, pw_hash, iterations FROM users WHERE username=?", (username,))
+    row = c.fetchone()
+    conn.close()
+    if not row:
+        hash_password(password, b"\0" * 16)
+        return None
+    user_id, salt, pw_hash, iterations = row
+    if hmac.compare_digest(hash_password(password, salt, iterations), pw_hash):
+        return user_id
+    return None
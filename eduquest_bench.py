@@ -0,0 +1,237 @@
+import sys, os, argparse, datetime, importlib.util, json, platform, random, statistics, tempfile, shutil
+from time import perf_counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets, QtCore
+
+from eduquest.db import connect_db, to_day, user_notes_dir
+from eduquest.schema import init_db
+from eduquest.users import create_user
+
+GUI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "# eduquest_gui.py")
+WORDS = ["Lecture", "Lab", "Exam", "Seminar", "Quiz", "Project", "Reading", "Tutorial", "Meeting", "Deadline",
+         "Physics", "Calculus", "History", "Biology", "Chemistry", "Programming", "Economics", "Literature"]
+
+
+def load_gui():
+    spec = importlib.util.spec_from_file_location("eduquest_gui", GUI_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def random_title(rng, words=3):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_database(user_id, events, sessions, cards, rng):
+    today = datetime.date.today()
+    conn = connect_db()
+    with conn:
+        conn.executemany("INSERT INTO events (user_id, uid, title, day, minute) VALUES (?,?,?,?,?)", (
+            (user_id, f"bench-{i}", random_title(rng),
+             to_day(today) + rng.randint(-365, 365),
+             rng.randint(7, 21) * 60 + rng.choice([0, 15, 30, 45]) if rng.random() < 0.8 else None)
+            for i in range(events)))
+        conn.executemany("INSERT INTO events (user_id, uid, title, day) VALUES (?,?,?,?)", (
+            (user_id, f"bench-card-{i}", f"{random_title(rng, 4)}? — {random_title(rng, 6)}", to_day(today))
+            for i in range(cards)))
+        rows = []
+        for _ in range(sessions):
+            start = datetime.datetime.combine(today, datetime.time(9)) - datetime.timedelta(minutes=rng.randint(0, 525600))
+            duration = rng.randint(60, 7200)
+            rows.append((user_id, rng.choice(["Notes", "Flashcards"]), int(start.timestamp()),
+                         int(start.timestamp()) + duration, duration))
+        conn.executemany("INSERT INTO study_sessions (user_id, type, start_ts, end_ts, duration_seconds) VALUES (?,?,?,?,?)", rows)
+    conn.close()
+
+
+def generate_notes(notes_dir, count, size_kb, rng):
+    for i in range(count):
+        paragraphs = []
+        size = 0
+        while size < size_kb * 1024:
+            paragraph = " ".join(rng.choice(WORDS).lower() for _ in range(rng.randint(20, 80)))
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 1
+        with open(os.path.join(notes_dir, f"note_{i:06d}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{random_title(rng)} {i}\n\n" + "\n".join(paragraphs))
+
+
+def measure(fn, repeat, app):
+    times = []
+    for _ in range(repeat):
+        started = perf_counter()
+        fn()
+        app.processEvents()
+        times.append((perf_counter() - started) * 1000)
+    return {"runs": repeat, "min_ms": min(times), "median_ms": statistics.median(times), "mean_ms": statistics.mean(times)}
+
+
+def open_dialog(app, gui, win, dialog_cls):
+    def run():
+        dlg = dialog_cls(win)
+        dlg.show()
+        app.processEvents()
+        dlg.reject()
+        dlg.deleteLater()
+    return run
+
+
+def run_benchmarks(gui, app, win, repeat):
+    results = {}
+
+    def populate_cold():
+        win.event_cache.clear()
+        win.populate_calendar(win.current_date.year, win.current_date.month)
+
+    def populate_warm():
+        win.populate_calendar(win.current_date.year, win.current_date.month)
+
+    def month_sweep():
+        win.event_cache.clear()
+        for _ in range(12):
+            win.change_month(1)
+        for _ in range(12):
+            win.change_month(-1)
+
+    def year_view():
+        win.set_view("year")
+        win.year_view.repaint()
+
+    def week_sweep():
+        win.set_view("week")
+        for _ in range(8):
+            win.navigate(1)
+            win.week_view.repaint()
+        win.set_view("month")
+
+    notes = gui.NotesDialog(win)
+
+    def notes_search():
+        for query in ("lec", "physics", "zzz", "a", ""):
+            notes.search_input.setText(query)
+
+    viewer = gui.FlashcardViewerDialog(win)
+
+    def flashcard_navigation():
+        viewer.show_card(0)
+        for _ in range(len(viewer.cards)):
+            viewer.flip_card()
+            viewer.flip_card()
+            viewer.show_next()
+
+    results["populate_calendar_cold"] = measure(populate_cold, repeat, app)
+    results["populate_calendar_warm"] = measure(populate_warm, repeat, app)
+    results["change_month_sweep_24"] = measure(month_sweep, repeat, app)
+    results["year_view_populate"] = measure(year_view, repeat, app)
+    results["week_view_sweep_8"] = measure(week_sweep, repeat, app)
+    results["notes_dialog_open"] = measure(open_dialog(app, gui, win, gui.NotesDialog), repeat, app)
+    results["notes_search"] = measure(notes_search, repeat, app)
+    results["study_history_open"] = measure(open_dialog(app, gui, win, gui.StudyHistoryDialog), repeat, app)
+    results["flashcard_navigation"] = measure(flashcard_navigation, repeat, app)
+    results["notifications_open"] = measure(open_dialog(app, gui, win, gui.NotificationsDialog), repeat, app)
+    for dlg in (notes, viewer):
+        dlg.reject()
+        dlg.deleteLater()
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'benchmark':<28}{'median ms':>12}{'baseline':>12}{'change':>10}")
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<28}{res['median_ms']:>12.2f}{'-':>12}{'-':>10}")
+            continue
+        change = res["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<28}{res['median_ms']:>12.2f}{base['median_ms']:>12.2f}{change:>+10.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless EduQuest benchmarks over synthetic data.")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--cards", type=int, default=50)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--note-kb", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="reference results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write these results to --baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated data directory")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="eduquest_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+        gui = load_gui()
+        init_db()
+        user_id = create_user("bench", "benchmark")
+        generate_database(user_id, args.events, args.sessions, args.cards, rng)
+        generate_notes(user_notes_dir(user_id), args.notes, args.note_kb, rng)
+
+        gui.MainWindow.show_login_screen = lambda self: None
+        win = gui.MainWindow()
+        win.maintenance.stop()
+        win.login_as(user_id, "bench")
+        win.show()
+        app.processEvents()
+
+        results = run_benchmarks(gui, app, win, args.repeat)
+        win.close()
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Synthetic data kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "generated": datetime.datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qt": QtCore.QT_VERSION_STR,
+            "params": {k: v for k, v in vars(args).items() if k in ("events", "sessions", "cards", "notes", "note_kb", "repeat", "seed")},
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("params") != report["meta"]["params"]:
+            print("Warning: baseline was recorded with different data sizes.")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,16 @@
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eduquest import db
+from eduquest.schema import init_db
+
+
+@pytest.fixture
+def eduquest_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB", str(tmp_path / "eduquest_gui.db"))
+    monkeypatch.setattr(db, "NOTES_DIR", str(tmp_path / "eduquest_notes"))
+    init_db()
+    return tmp_path
@@ -0,0 +1,89 @@
+import json, datetime
+
+import pytest
+
+from eduquest import db
+from eduquest.cli import main
+from eduquest.users import create_user
+from eduquest.sessions import open_session_segment, close_session_segment
+from eduquest.events import day_activity, week_activity
+from eduquest.db import to_day
+
+DAY = datetime.date(2026, 10, 20)
+
+
+def run(capsys, *argv):
+    code = main(["--db", db.DB, "--notes-dir", db.NOTES_DIR, *argv])
+    return code, capsys.readouterr()
+
+
+def test_report_counts_days_with_less_than_a_minute_of_study(eduquest_db, capsys):
+    user_id = create_user("alice", "secret1")
+    start = datetime.datetime.combine(DAY, datetime.time(12)).timestamp()
+    close_session_segment(open_session_segment(user_id, "Flashcards", start), start, start + 45)
+    assert run(capsys, "-u", "alice", "add", "event", DAY.isoformat(), "Calculus lecture", "--time", "09:00")[0] == 0
+
+    code, out = run(capsys, "-u", "alice", "--json", "report", "--from", DAY.isoformat(), "--to", DAY.isoformat())
+    report = json.loads(out.out)
+    assert code == 0
+    assert (report["events"], report["busy_days"]) == (1, 1)
+    assert (report["study_seconds"], report["study_days"]) == (45, 1)
+    assert report["study_by_type"] == {"Flashcards": {"sessions": 1, "seconds": 45}}
+
+    code, out = run(capsys, "-u", "alice", "report", "--from", DAY.isoformat(), "--to", DAY.isoformat())
+    assert "Study time:      45s on 1 days" in out.out
+
+
+def test_week_and_year_views_count_study_in_seconds(eduquest_db):
+    user_id = create_user("alice", "secret1")
+    start = datetime.datetime.combine(DAY, datetime.time(12)).timestamp()
+    close_session_segment(open_session_segment(user_id, "Flashcards", start), start, start + 45)
+    close_session_segment(open_session_segment(user_id, "Notes", start + 60), start + 60, start + 60 + 3600)
+
+    day = to_day(DAY)
+    assert week_activity(user_id, day)[1] == {day: 3645}
+    assert day_activity(user_id, day - 7, day + 7) == {day: (0, 3645)}
+
+
+def test_add_and_list_events(eduquest_db, capsys):
+    create_user("alice", "secret1")
+    run(capsys, "-u", "alice", "add", "event", DAY.isoformat(), "Physics lab", "--time", "14:00")
+    code, out = run(capsys, "-u", "alice", "--json", "list", "events", "--from", DAY.isoformat(), "--to", DAY.isoformat())
+    assert code == 0
+    assert [(ev["date"], ev["time"], ev["title"]) for ev in json.loads(out.out)] == [(DAY.isoformat(), "14:00", "Physics lab")]
+
+
+def test_add_event_rejects_invalid_times(eduquest_db, capsys):
+    create_user("alice", "secret1")
+    for value in ("25:99", "9am"):
+        with pytest.raises(SystemExit) as exit_info:
+            run(capsys, "-u", "alice", "add", "event", DAY.isoformat(), "Physics lab", "--time", value)
+        assert exit_info.value.code == 2
+        assert f"invalid time '{value}': use 24-hour HH:MM" in capsys.readouterr().err
+    code, out = run(capsys, "-u", "alice", "--json", "list", "events", "--from", DAY.isoformat(), "--to", DAY.isoformat())
+    assert json.loads(out.out) == []
+
+
+def test_backups_are_written_next_to_the_database(eduquest_db, capsys, monkeypatch):
+    (eduquest_db / "elsewhere").mkdir()
+    monkeypatch.chdir(eduquest_db / "elsewhere")
+    code, out = run(capsys, "maintain", "backup")
+    assert code == 0 and "backup: ok" in out.out
+    assert [path.parent for path in eduquest_db.glob("*/*.db")] == [eduquest_db / "eduquest_backups"]
+
+
+def test_migration_notices_stay_off_stdout(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(db, "DB", str(tmp_path / "fresh.db"))
+    monkeypatch.setattr(db, "NOTES_DIR", str(tmp_path / "notes"))
+    monkeypatch.setenv("EDUQUEST_PASSWORD", "secret1")
+    code, out = run(capsys, "add", "user", "alice")
+    assert code == 0 and out.out.strip().isdigit()
+    assert "MIGRATING DATABASE" in out.err
+
+
+def test_unknown_or_missing_user_is_an_error(eduquest_db, capsys, monkeypatch):
+    monkeypatch.delenv("EDUQUEST_USER", raising=False)
+    code, out = run(capsys, "list", "notes")
+    assert code == 1 and "--user" in out.err
+    code, out = run(capsys, "-u", "nobody", "list", "notes")
+    assert code == 1 and "No such user: nobody" in out.err
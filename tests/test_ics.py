@@ -0,0 +1,128 @@
+import time
+
+from eduquest.db import connect_db, from_day, from_minute
+from eduquest.ics import import_ics, export_ics
+from eduquest.users import create_user
+
+TIMETABLE = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:lecture-1@example.edu\r\n"
+    "DTSTART:20261020T090000\r\n"
+    "SUMMARY:Calculus lecture\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:lab-1@example.edu\r\n"
+    "DTSTART:20261021T140000\r\n"
+    "SUMMARY:Physics lab\\, group B\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "DTSTART;VALUE=DATE:20261023\r\n"
+    "SUMMARY:Essay deadline\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+SEMINARS = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:seminar@example.edu\r\n"
+    "RECURRENCE-ID:20261027T090000\r\n"
+    "DTSTART:20261028T110000\r\n"
+    "SUMMARY:Seminar (moved)\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:seminar@example.edu\r\n"
+    "DTSTART:20261020T090000\r\n"
+    "RRULE:FREQ=WEEKLY;COUNT=12\r\n"
+    "EXDATE:20261103T090000\r\n"
+    "SUMMARY:Seminar\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:club@example.edu\r\n"
+    "DTSTART:20261013T180000\r\n"
+    "RRULE:FREQ=MONTHLY;BYDAY=2TU\r\n"
+    "SUMMARY:Chess club\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+TUTORIALS = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:tutorial@example.edu\r\n"
+    "DTSTART;TZID=Europe/Berlin:20261020T090000\r\n"
+    "RRULE:FREQ=WEEKLY;BYDAY=TU,TH;UNTIL=20261030T000000Z\r\n"
+    "SUMMARY:Tutorial\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+def write_timetable(tmp_path, text=TIMETABLE):
+    path = tmp_path / "timetable.ics"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def count_events(user_id):
+    conn = connect_db()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM events WHERE user_id=?", (user_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def list_events(user_id):
+    conn = connect_db()
+    try:
+        rows = conn.execute("SELECT day, minute, title FROM events WHERE user_id=? ORDER BY day, minute", (user_id,)).fetchall()
+    finally:
+        conn.close()
+    return [(from_day(day).isoformat(), from_minute(minute), title) for day, minute, title in rows]
+
+
+def test_import_reports_inserted_events(eduquest_db):
+    user_id = create_user("alice", "secret1")
+    path = write_timetable(eduquest_db)
+    assert import_ics(path, user_id, batch_size=2) == (3, 3, 0)
+    assert import_ics(path, user_id, batch_size=2) == (3, 0, 0)
+    assert count_events(user_id) == 3
+
+
+def test_export_round_trips_to_another_account(eduquest_db):
+    alice = create_user("alice", "secret1")
+    bob = create_user("bob", "secret2")
+    import_ics(write_timetable(eduquest_db), alice)
+    exported = str(eduquest_db / "export.ics")
+    assert export_ics(exported, alice) == 3
+    assert import_ics(exported, bob) == (3, 3, 0)
+    assert count_events(bob) == 3
+
+
+def test_import_expands_recurring_events(eduquest_db):
+    user_id = create_user("alice", "secret1")
+    path = write_timetable(eduquest_db, SEMINARS)
+    assert import_ics(path, user_id) == (11, 11, 1)
+    assert import_ics(path, user_id) == (11, 0, 1)
+    events = list_events(user_id)
+    assert events[:3] == [("2026-10-20", "09:00", "Seminar"), ("2026-10-28", "11:00", "Seminar (moved)"),
+                          ("2026-11-10", "09:00", "Seminar")]
+    assert events[-1] == ("2027-01-05", "09:00", "Seminar")
+
+
+def test_import_expands_zoned_recurrence_in_its_own_zone(eduquest_db, monkeypatch):
+    user_id = create_user("alice", "secret1")
+    try:
+        with monkeypatch.context() as m:
+            m.setenv("TZ", "UTC")
+            time.tzset()
+            assert import_ics(write_timetable(eduquest_db, TUTORIALS), user_id) == (4, 4, 0)
+    finally:
+        time.tzset()
+    assert [(day, minute) for day, minute, _ in list_events(user_id)] == [
+        ("2026-10-20", "07:00"), ("2026-10-22", "07:00"), ("2026-10-27", "08:00"), ("2026-10-29", "08:00")]
@@ -0,0 +1,63 @@
+import sqlite3, datetime
+
+import pytest
+
+from eduquest import db
+from eduquest.db import connect_db, to_day
+from eduquest.schema import init_db
+from eduquest.users import DEMO_USER, find_user, password_change_required
+from eduquest.flashcards import list_flashcards
+
+START = "2026-10-20T12:00:00.250000"
+END = "2026-10-20T12:25:00.250000"
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    """A database as the single-user app before accounts wrote it: TEXT dates and ISO timestamps."""
+    monkeypatch.setattr(db, "DB", str(tmp_path / "eduquest_gui.db"))
+    monkeypatch.setattr(db, "NOTES_DIR", str(tmp_path / "eduquest_notes"))
+    conn = sqlite3.connect(db.DB)
+    conn.executescript("""
+        CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, date TEXT NOT NULL, time TEXT);
+        CREATE TABLE study_sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL,
+                                     start_time TEXT NOT NULL, end_time TEXT NOT NULL, duration_seconds INTEGER NOT NULL);
+    """)
+    conn.executemany("INSERT INTO events (title, date, time) VALUES (?,?,?)", [
+        ("Calculus lecture", "2026-10-20", "09:30"),
+        ("Essay deadline", "2026-10-23", None),
+        ("Mitosis — Cell division", "2026-10-20", None),
+        ("Someday", "next week", None),
+    ])
+    conn.executemany("INSERT INTO study_sessions (type, start_time, end_time, duration_seconds) VALUES (?,?,?,?)", [
+        ("Flashcards", START, END, 1500),
+        ("Notes", "yesterday", END, 60),
+    ])
+    conn.commit()
+    conn.close()
+    return tmp_path
+
+
+def test_migrates_baseline_schema_without_losing_rows(baseline_db):
+    init_db()
+    demo = find_user(DEMO_USER[0])
+    assert password_change_required(demo)
+    assert len(list(baseline_db.glob("eduquest_gui-pre-migration-*.db"))) == 1
+
+    conn = connect_db()
+    try:
+        events = conn.execute("SELECT user_id, title, day, minute FROM events ORDER BY id").fetchall()
+        sessions = conn.execute("SELECT user_id, type, start_ts, end_ts, duration_seconds FROM study_sessions").fetchall()
+        kept_events = conn.execute("SELECT title, date FROM events_unmigrated").fetchall()
+        kept_sessions = conn.execute("SELECT type, start_time FROM study_sessions_unmigrated").fetchall()
+    finally:
+        conn.close()
+
+    day = to_day("2026-10-20")
+    assert events == [(demo, "Calculus lecture", day, 9 * 60 + 30), (demo, "Essay deadline", day + 3, None),
+                      (demo, "Mitosis — Cell division", day, None)]
+    start, end = (int(datetime.datetime.fromisoformat(value).timestamp()) for value in (START, END))
+    assert sessions == [(demo, "Flashcards", start, end, 1500)]
+    assert kept_events == [("Someday", "next week")]
+    assert kept_sessions == [("Notes", "yesterday")]
+    assert [front for _, front, _ in list_flashcards(demo, datetime.date(2026, 10, 20))] == ["Mitosis"]
@@ -0,0 +1,184 @@
+import os
+
+import pytest
+
+from eduquest import db
+from eduquest.db import connect_db
+from eduquest.schema import init_db
+from eduquest.users import create_user
+from eduquest.events import add_event, delete_event
+from eduquest.notes import list_notes, save_note
+from eduquest.sessions import (SESSION_MIN_SECONDS, open_session_segment, checkpoint_session_segments,
+                               close_session_segment, recover_open_sessions)
+from eduquest.sync import export_sync_bundle, import_sync_bundle
+
+
+class Install:
+    def __init__(self, root, name):
+        self.root = root
+        self.name = name
+        self.bundles = 0
+        with self:
+            init_db()
+            self.user_id = create_user("alice", "secret1")
+            self.origin = self.query("SELECT value FROM sync_meta WHERE key='install_id'")[0][0]
+
+    def __enter__(self):
+        db.DB = str(self.root / "eduquest_gui.db")
+        db.NOTES_DIR = str(self.root / "eduquest_notes")
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def query(self, sql, params=()):
+        conn = connect_db()
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def rename_event(self, uid, title):
+        with self:
+            self.query("UPDATE events SET title=? WHERE user_id=? AND uid=?", (title, self.user_id, uid))
+
+    def version(self, entity, uid):
+        with self:
+            return tuple(self.query("SELECT clock, origin FROM sync_versions WHERE user_id=? AND entity=? AND uid=?",
+                                    (self.user_id, entity, uid))[0])
+
+    def snapshot(self):
+        with self:
+            events = self.query("SELECT uid, title, day, minute FROM events WHERE user_id=? ORDER BY uid", (self.user_id,))
+            notes = {}
+            for fpath in list_notes(self.user_id).values():
+                with open(fpath, encoding="utf-8") as f:
+                    notes[os.path.basename(fpath)] = f.read()
+        return events, notes
+
+    def send_to(self, other):
+        self.bundles += 1
+        path = str(self.root / f"to-{other.name}-{self.bundles}.eqsync")
+        with self:
+            export_sync_bundle(path, self.user_id, "alice", peer=other.name)
+        with other:
+            return import_sync_bundle(path, other.user_id)
+
+
+@pytest.fixture
+def installs(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB", db.DB)
+    monkeypatch.setattr(db, "NOTES_DIR", db.NOTES_DIR)
+    (tmp_path / "lab").mkdir()
+    (tmp_path / "home").mkdir()
+    return Install(tmp_path / "lab", "lab"), Install(tmp_path / "home", "home")
+
+
+def journal_rows(install, entity):
+    with install:
+        return install.query("SELECT COUNT(*) FROM change_log WHERE entity=?", (entity,))[0][0]
+
+
+def event_uid(install, event_id):
+    with install:
+        return install.query("SELECT uid FROM events WHERE id=?", (event_id,))[0][0]
+
+
+def test_two_installs_converge(installs):
+    lab, home = installs
+    with lab:
+        lecture = add_event(lab.user_id, "2026-10-20", "Calculus lecture", "09:00")
+        physics_lab = add_event(lab.user_id, "2026-10-21", "Physics lab", "14:00")
+        note = os.path.basename(save_note(lab.user_id, "Reading list", "Chapter 1"))
+    lecture_uid = event_uid(lab, lecture)
+
+    assert lab.send_to(home) == (3, 0)
+    assert home.snapshot() == lab.snapshot()
+
+    lab.rename_event(lecture_uid, "Calculus lecture (room 4)")
+    home.rename_event(lecture_uid, "Calculus lecture (online)")
+    with lab:
+        delete_event(lab.user_id, physics_lab)
+    with home:
+        save_note(home.user_id, "Reading list", "Chapter 1\nChapter 2", os.path.join(db.NOTES_DIR, f"user_{home.user_id}", note))
+
+    lab_clock, home_clock = lab.version("event", lecture_uid), home.version("event", lecture_uid)
+    assert lab_clock[0] == home_clock[0], "both edits should carry the same Lamport clock"
+
+    lab.send_to(home)
+    home.send_to(lab)
+    assert lab.send_to(home)[0] == 0
+    assert home.send_to(lab)[0] == 0
+
+    events, notes = lab.snapshot()
+    assert home.snapshot() == (events, notes)
+    winner = "Calculus lecture (room 4)" if lab.origin > home.origin else "Calculus lecture (online)"
+    assert [title for _, title, _, _ in events] == [winner]
+    assert notes == {note: "Reading list\n\nChapter 1\nChapter 2"}
+
+
+def test_later_clock_beats_origin(installs):
+    lab, home = installs
+    with lab:
+        lecture = add_event(lab.user_id, "2026-10-20", "Calculus lecture")
+    lecture_uid = event_uid(lab, lecture)
+    lab.send_to(home)
+
+    loser, winner = (lab, home) if lab.origin > home.origin else (home, lab)
+    loser.rename_event(lecture_uid, "Edited once")
+    winner.rename_event(lecture_uid, "Edited")
+    winner.rename_event(lecture_uid, "Edited twice")
+    lab.send_to(home)
+    home.send_to(lab)
+
+    assert lab.snapshot() == home.snapshot()
+    assert lab.snapshot()[0][0][1] == "Edited twice"
+
+
+def test_only_finished_study_sessions_are_journaled(installs):
+    lab, home = installs
+    with lab:
+        short = open_session_segment(lab.user_id, "Notes", 1000)
+        checkpoint_session_segments([(short, 1000)], 1000 + SESSION_MIN_SECONDS)
+        assert close_session_segment(short, 1000, 1000 + SESSION_MIN_SECONDS) == 0
+        assert journal_rows(lab, "session") == 0
+
+        kept = open_session_segment(lab.user_id, "Notes", 2000)
+        checkpoint_session_segments([(kept, 2000)], 2030)
+        checkpoint_session_segments([(kept, 2000)], 2060)
+        assert journal_rows(lab, "session") == 0
+        assert close_session_segment(kept, 2000, 2090) == 90
+        assert journal_rows(lab, "session") == 1
+
+        crashed = open_session_segment(lab.user_id, "Flashcards", 3000)
+        checkpoint_session_segments([(crashed, 3000)], 3045)
+        conn = connect_db()
+        with conn:
+            recover_open_sessions(conn.cursor())
+        conn.close()
+        assert journal_rows(lab, "session") == 2
+
+    lab.send_to(home)
+    with home:
+        assert home.query("SELECT type, duration_seconds, is_open FROM study_sessions ORDER BY start_ts") == [
+            ("Notes", 90, 0), ("Flashcards", 45, 0)]
+
+
+def test_journal_compaction_waits_for_every_peer(installs):
+    lab, home = installs
+    with lab:
+        fpath = save_note(lab.user_id, "Draft", "v1")
+        export_sync_bundle(str(lab.root / "laptop.eqsync"), lab.user_id, "alice", peer="laptop")
+        save_note(lab.user_id, "Draft", "v2", fpath)
+        save_note(lab.user_id, "Draft", "v3", fpath)
+        assert journal_rows(lab, "note") == 3
+        payloads = lab.query("SELECT payload FROM change_log WHERE entity='note'")
+        assert all("v3" not in payload for payload, in payloads)
+
+    lab.send_to(home)
+    assert journal_rows(lab, "note") == 3
+    with lab:
+        export_sync_bundle(str(lab.root / "laptop.eqsync"), lab.user_id, "alice", peer="laptop")
+    assert journal_rows(lab, "note") == 1
+    assert home.snapshot()[1] == {os.path.basename(fpath): "Draft\n\nv3"}